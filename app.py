@@ -4,12 +4,29 @@ import argparse
 import asyncio
 
 from utility.script.script_generator import generate_script
-from utility.audio.audio_generator import generate_audio
-from utility.captions.karaoke_generator import generate_timed_captions
+from utility.audio.audio_generator import (
+    TTS_CONCURRENCY,
+    generate_audio,
+    generate_audio_concurrent,
+    generate_audio_with_boundaries
+)
+from utility.audio.tts_cache import TTS_CACHE_ENABLED
+from utility.captions.karaoke_generator import generate_timed_captions, default_model_size
+from utility.captions.model_registry import default_quantize, format_model_stats, start_warm_worker
+from utility.captions.tts_captions import captions_from_boundaries
+from utility.captions.forced_alignment import captions_from_script
+from utility.captions.transcription_cache import cache_stats
+from utility.captions.ass_exporter import export_ass
 from utility.captions.timed_captions_generator import generate_timed_captions as generate_frase
 from utility.video.video_search_query_generator import getVideoSearchQueriesTimed, merge_empty_intervals
 from utility.video.background_video_generator import generate_video_url
+from utility.render.profiles import (
+    FINAL_PROFILE, PREVIEW_PROFILE, RENDER_PROFILES, get_profile, master_profile
+)
 from utility.render.render_karaoke import get_output_media
+from utility.render.render_ffmpeg import get_output_media as get_output_media_ffmpeg
+from utility.render.render_parallel import get_output_media as get_output_media_parallel
+from utility.render.render_pipeline import get_output_media as get_output_media_pipeline
 
 def main():
     parser = argparse.ArgumentParser(
@@ -21,13 +38,80 @@ def main():
         default=os.getenv('TTS_VOICE', 'pt-BR-AntonioNeural'),
         help="Voz TTS (ex: pt-BR-AntonioNeural)"
     )
+    parser.add_argument(
+        "--tts-concurrency", type=int, default=TTS_CONCURRENCY,
+        help="Frases sintetizadas em paralelo (1 com TTS_CACHE=0: roteiro inteiro num único stream)"
+    )
     parser.add_argument(
         "--video-source", type=str,
         default=os.getenv('VIDEO_SOURCE', 'pexels'),
         help="Serviço de vídeo de fundo (e.g. pexels)"
     )
+    parser.add_argument(
+        "--render-backend", type=str, choices=["moviepy", "ffmpeg", "parallel", "pipeline"],
+        default=os.getenv('RENDER_BACKEND', 'moviepy'),
+        help="Backend de renderização: moviepy (frame a frame), ffmpeg (filtergraph nativo) "
+             "parallel (moviepy por trechos em vários processos) ou pipeline "
+             "(download, normalização e composição sobrepostos)"
+    )
+    parser.add_argument(
+        "--chunk-length", type=float, default=None,
+        help="No backend parallel, tamanho fixo dos trechos em segundos (padrão: fronteiras dos fundos)"
+    )
+    parser.add_argument(
+        "--export-ass", type=str, default=None, metavar="ARQUIVO",
+        help="Exporta as legendas karaokê em .ass (sidecar); no backend ffmpeg, são queimadas via libass"
+    )
+    parser.add_argument(
+        "--prenormalize", action="store_true",
+        default=os.getenv('PRENORMALIZE_BACKGROUNDS', '0') == '1',
+        help="Transcodifica os fundos em paralelo para 1920x1080/25fps antes do render (moviepy)"
+    )
+    parser.add_argument(
+        "--preview", action="store_true",
+        help="Rascunho rápido: 640x360, 15fps, preset ultrafast e fundos em resolução menor"
+    )
+    parser.add_argument(
+        "--profiles", type=str, default=None,
+        help="Perfis gerados num único passe, separados por vírgula "
+             f"({', '.join(RENDER_PROFILES)}; ex: final,portrait). O primeiro define a "
+             "decodificação dos fundos (backend moviepy)"
+    )
+    parser.add_argument(
+        "--warm-whisper", action="store_true",
+        default=os.getenv('WHISPER_WARM_WORKER', '0') == '1',
+        help="Carrega o modelo Whisper num processo à parte enquanto roteiro e TTS são gerados"
+    )
+    parser.add_argument(
+        "--quantize", action="store_true", default=default_quantize,
+        help="Transcreve com o modelo Whisper quantizado em int8 na CPU (threads via WHISPER_THREADS)"
+    )
+    parser.add_argument(
+        "--tts-timestamps", action="store_true",
+        default=os.getenv('TTS_WORD_TIMESTAMPS', '0') == '1',
+        help="Usa os WordBoundary do edge-tts como tempos das palavras (dispensa o Whisper)"
+    )
+    parser.add_argument(
+        "--forced-alignment", action="store_true",
+        default=os.getenv('FORCED_ALIGNMENT', '0') == '1',
+        help="Alinha o roteiro conhecido ao áudio (energia + DTW) em vez de transcrever; "
+             "usa o Whisper se a confiança for baixa"
+    )
+    parser.add_argument(
+        "--chunked-transcription", action="store_true",
+        default=os.getenv('CHUNKED_TRANSCRIPTION', '0') == '1',
+        help="Corta a narração nos silêncios e transcreve os trechos em processos paralelos"
+    )
     args = parser.parse_args()
+    profile = PREVIEW_PROFILE if args.preview else FINAL_PROFILE
+    profiles = [get_profile(name.strip()) for name in args.profiles.split(",")] if args.profiles else None
+    if profiles:
+        # fundos buscados e compostos no maior perfil; os menores só reduzem
+        profile = master_profile(profiles)
+
 
+    if args.warm_whisper and not args.tts_timestamps:
+        start_warm_worker(default_model_size, quantize=args.quantize)
 
     # 1. Roteiro
     script = generate_script(args.topic)
@@ -35,14 +119,46 @@ def main():
 
     # 2. Áudio TTS
     print(f"[2/5] Gerando áudio TTS...")
-    asyncio.run(generate_audio(script, "audio_tts.wav", voice=args.tts_voice))
+    # o caminho por frases também é o que usa o cache de frases
+    if args.tts_concurrency > 1 or TTS_CACHE_ENABLED:
+        tts = asyncio.run(generate_audio_concurrent(
+            script, "audio_tts.wav", voice=args.tts_voice, concurrency=args.tts_concurrency
+        ))
+        boundaries = tts["boundaries"]
+        print(
+            f" {len(tts['sentences'])} frases em {tts['seconds']:.1f}s "
+            f"({tts['cached']} do cache de TTS)"
+        )
+    elif args.tts_timestamps:
+        boundaries = asyncio.run(
+            generate_audio_with_boundaries(script, "audio_tts.wav", voice=args.tts_voice)
+        )
+    else:
+        asyncio.run(generate_audio(script, "audio_tts.wav", voice=args.tts_voice))
 
     # 3. Legendas Karaoke
-    print("[3/5] Transcrevendo áudio para legendas temporizadas...")
-    captions, words = generate_timed_captions("audio_tts.wav")
+    if args.tts_timestamps:
+        print("[3/5] Montando legendas temporizadas a partir dos tempos do TTS...")
+        captions, words = captions_from_boundaries(script, boundaries)
+    elif args.forced_alignment:
+        print("[3/5] Alinhando o roteiro ao áudio...")
+        captions, words = captions_from_script(
+            script, "audio_tts.wav", chunked=args.chunked_transcription, quantize=args.quantize
+        )
+    else:
+        print("[3/5] Transcrevendo áudio para legendas temporizadas...")
+        captions, words = generate_timed_captions(
+            "audio_tts.wav", chunked=args.chunked_transcription, quantize=args.quantize
+        )
     print(f"captions {(captions)}")
     print(f"words {(words)}")
     print(f" {len(captions)} legendas geradas")
+    if not args.tts_timestamps:
+        hits = cache_stats()["hits"]
+        print(f" Whisper: {format_model_stats()}; {hits} transcrição(ões) do cache")
+    if args.export_ass:
+        export_ass(captions, words, args.export_ass)
+        print(f" legendas .ass exportadas em {args.export_ass}")
 
     # 4. Queries de vídeo
     print("[4/5] Gerando queries de busca para vídeos de fundo...")
@@ -53,14 +169,41 @@ def main():
 
     # 5. URLs de vídeo e merge
     print("[5/5] Obtendo vídeos de fundo...")
-    urls = generate_video_url(queries, args.video_source)
+    # os fundos do Pexels são buscados em paisagem; perfis verticais são recortados deles
+    target_size = (profile["width"], profile["height"]) if profile["width"] >= profile["height"] else None
+    urls = generate_video_url(queries, args.video_source, target_size=target_size)
     #print(urls)
     urls = merge_empty_intervals(urls)
 
     # 6. Render final
     print("Renderizando vídeo final...")
     print(args.video_source)
-    output = get_output_media("audio_tts.wav", captions, words, urls, args.video_source)
+    if profiles:
+        if args.render_backend != "moviepy":
+            print(f"⚠️ --profiles usa o backend moviepy (ignorando '{args.render_backend}')")
+        output = ", ".join(get_output_media(
+            "audio_tts.wav", captions, words, urls, args.video_source,
+            prenormalize=args.prenormalize, profiles=profiles
+        ))
+    elif args.render_backend == "ffmpeg":
+        output = get_output_media_ffmpeg(
+            "audio_tts.wav", captions, words, urls, args.video_source,
+            subtitles_path=args.export_ass, profile=profile
+        )
+    elif args.render_backend == "parallel":
+        output = get_output_media_parallel(
+            "audio_tts.wav", captions, words, urls, args.video_source,
+            chunk_length=args.chunk_length, prenormalize=args.prenormalize, profile=profile
+        )
+    elif args.render_backend == "pipeline":
+        output = get_output_media_pipeline(
+            "audio_tts.wav", captions, words, urls, args.video_source, profile=profile
+        )
+    else:
+        output = get_output_media(
+            "audio_tts.wav", captions, words, urls, args.video_source,
+            prenormalize=args.prenormalize, profile=profile
+        )
     print(f"Vídeo gerado em: {output}")
 
 if __name__ == '__main__':
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark do alinhamento de legendas (utility.captions.caption_alignment)
+contra a implementação quadrática anterior, em transcrições sintéticas.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.caption_alignment --words 10000 30000 100000
+"""
+import re
+import time
+import random
+import argparse
+
+from utility.captions.caption_alignment import clean_word, get_captions_with_time
+
+MAX_CAPTION_SIZE = 40
+VOCABULARY = (
+    "o a de que e do da em um para com não uma os no se na por mais as dos "
+    "como mas foi ao ele das tem à seu sua ou ser quando muito há nos já está "
+    "eu também só pelo pela até isso ela entre era depois sem mesmo aos ter "
+    "seus quem nas me esse eles estão você tinha foram essa num nem suas meu "
+    "governo econômico política mercado população tecnologia inteligência "
+    "guarda-chuva pré-história d'água \"citação\" 2024 R$10"
+).split()
+
+
+# --- implementação anterior (referência), O(n²) ---
+
+def reference_split_words_by_size(words, max_caption_size):
+    half_size = max_caption_size / 2
+    captions = []
+    while words:
+        caption = words.pop(0)
+        while words and len(caption + ' ' + words[0]) <= max_caption_size:
+            caption += ' ' + words.pop(0)
+            if len(caption) >= half_size and words:
+                break
+        captions.append(caption)
+    return captions
+
+
+def reference_get_timestamp_mapping(whisper_analysis):
+    index = 0
+    mapping = {}
+    for segment in whisper_analysis.get('segments', []):
+        for word in segment.get('words', []):
+            start_idx = index
+            end_idx = start_idx + len(word['text']) + 1
+            mapping[(start_idx, end_idx)] = word.get('end')
+            index = end_idx
+    return mapping
+
+
+def reference_interpolate_time(position, mapping):
+    for (start, end), ts in mapping.items():
+        if start <= position <= end:
+            return ts
+    return None
+
+
+def reference_get_captions_with_time(whisper_analysis, max_caption_size, consider_punctuation):
+    word_map = reference_get_timestamp_mapping(whisper_analysis)
+    position = 0
+    start_time = 0
+    captions = []
+    text = whisper_analysis.get('text', '')
+    if consider_punctuation:
+        sentences = re.split(r'(?<=[.!?]) +', text)
+        chunks = []
+        for sentence in sentences:
+            cleaned = [clean_word(w) for w in sentence.split()]
+            chunks.extend(reference_split_words_by_size(cleaned, max_caption_size))
+    else:
+        cleaned = [clean_word(w) for w in text.split()]
+        chunks = reference_split_words_by_size(cleaned, max_caption_size)
+    for chunk in chunks:
+        position += len(chunk) + 1
+        end_time = reference_interpolate_time(position, word_map)
+        if end_time is not None and chunk:
+            captions.append(((start_time, end_time), chunk))
+            start_time = end_time
+    return captions
+
+
+# --- transcrição sintética no formato do transcribe_timestamped ---
+
+def synthetic_analysis(n_words: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    t = 0.0
+    segments = []
+    tokens = []
+    words = []
+    for i in range(n_words):
+        token = rng.choice(VOCABULARY)
+        if rng.random() < 0.08:
+            token += rng.choice(".!?,;")
+        duration = 0.1 + 0.05 * len(token)
+        words.append({"text": token, "start": t, "end": t + duration})
+        tokens.append(token)
+        t += duration + rng.choice((0.0, 0.02, 0.3))
+        if len(words) == 30 or i == n_words - 1:
+            segments.append({"words": words})
+            words = []
+    return {"text": " ".join(tokens), "segments": segments}
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--words", type=int, nargs="+", default=[10000, 30000, 100000])
+    parser.add_argument(
+        "--reference-max", type=int, default=30000,
+        help="Maior tamanho em que a implementação anterior também é medida (é quadrática)"
+    )
+    args = parser.parse_args()
+
+    print(f"{'palavras':>9} {'punct':>6} {'novo (s)':>10} {'anterior (s)':>13} {'ganho':>8}  saída")
+    for n_words in args.words:
+        analysis = synthetic_analysis(n_words)
+        for punct in (True, False):
+            new, new_s = timed(get_captions_with_time, analysis, MAX_CAPTION_SIZE, punct)
+            if n_words <= args.reference_max:
+                old, old_s = timed(reference_get_captions_with_time, analysis, MAX_CAPTION_SIZE, punct)
+                same = "idêntica" if new == old else "DIFERENTE"
+                print(f"{n_words:>9} {str(punct):>6} {new_s:>10.3f} {old_s:>13.3f} {old_s / new_s:>7.0f}x  {same}")
+                if new != old:
+                    raise SystemExit("saída diferente da implementação anterior")
+            else:
+                print(f"{n_words:>9} {str(punct):>6} {new_s:>10.3f} {'-':>13} {'-':>8}  ({len(new)} legendas)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Serviço de TTS falso, local, com a mesma interface de edge_tts.Communicate
+(stream() assíncrono com eventos 'audio' e 'WordBoundary'). Cada palavra vira
+um tom de duração proporcional ao tamanho; a latência da primeira resposta e
+a velocidade de síntese simulam o serviço real.
+
+    from benchmarks.fake_tts import FakeCommunicateFactory
+    factory = FakeCommunicateFactory(first_byte_latency=0.3, realtime_factor=5)
+    await generate_audio_concurrent(texto, "saida.wav", communicate_factory=factory)
+"""
+import io
+import wave
+import asyncio
+
+import numpy as np
+
+from utility.audio.audio_generator import TICKS_PER_SECOND, TTS_SAMPLE_RATE
+
+CHUNK_BYTES = 4096
+
+
+def synthesize_pcm(text: str, sample_rate: int = TTS_SAMPLE_RATE) -> tuple:
+    """PCM int16 determinístico do texto e [(início, duração, palavra)] em segundos."""
+    pieces = [np.zeros(int(0.1 * sample_rate), np.int16)]
+    words = []
+    position = len(pieces[0])
+    for i, word in enumerate(text.split()):
+        n = int((0.08 + 0.04 * len(word)) * sample_rate)
+        t = np.arange(n) / sample_rate
+        tone = (8000 * np.sin(2 * np.pi * (180 + 20 * (i % 7)) * t)).astype(np.int16)
+        words.append((position / sample_rate, n / sample_rate, word))
+        gap = np.zeros(int(0.05 * sample_rate), np.int16)
+        pieces += [tone, gap]
+        position += n + len(gap)
+    pieces.append(np.zeros(int(0.15 * sample_rate), np.int16))
+    return np.concatenate(pieces), words
+
+
+def wav_bytes(samples: np.ndarray, sample_rate: int = TTS_SAMPLE_RATE) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+class FakeCommunicate:
+    def __init__(self, text: str, voice: str, first_byte_latency: float, realtime_factor: float, log: list,
+                 rate: str = "+0%", pitch: str = "+0Hz"):
+        self.text = text
+        self.voice = voice
+        self.rate = rate
+        self.pitch = pitch
+        self.first_byte_latency = first_byte_latency
+        self.realtime_factor = realtime_factor
+        log.append(text)
+
+    async def stream(self):
+        samples, words = synthesize_pcm(self.text)
+        await asyncio.sleep(self.first_byte_latency)
+        for start, duration, word in words:
+            yield {
+                "type": "WordBoundary",
+                "offset": int(round(start * TICKS_PER_SECOND)),
+                "duration": int(round(duration * TICKS_PER_SECOND)),
+                "text": word,
+            }
+        data = wav_bytes(samples)
+        # bytes liberados no ritmo de síntese do serviço
+        seconds_per_chunk = CHUNK_BYTES / 2 / TTS_SAMPLE_RATE / self.realtime_factor
+        for i in range(0, len(data), CHUNK_BYTES):
+            await asyncio.sleep(seconds_per_chunk)
+            yield {"type": "audio", "data": data[i:i + CHUNK_BYTES]}
+
+
+class FakeCommunicateFactory:
+    """Fábrica compatível com communicate_factory(text, voice, rate=, pitch=); registra os textos pedidos."""
+
+    def __init__(self, first_byte_latency: float = 0.3, realtime_factor: float = 5.0):
+        self.first_byte_latency = first_byte_latency
+        self.realtime_factor = realtime_factor
+        self.requests = []
+
+    def __call__(self, text: str, voice: str, rate: str = "+0%", pitch: str = "+0Hz") -> FakeCommunicate:
+        return FakeCommunicate(
+            text, voice, self.first_byte_latency, self.realtime_factor, self.requests, rate=rate, pitch=pitch
+        )
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Confere o alinhamento forçado (utility.captions.forced_alignment) numa
+narração sintética longa (~10 min por padrão): voz harmônica com f0 variável,
+sílabas moduladas, ruído de fundo e pausas irregulares (algumas frases
+emendadas sem silêncio). Mede o erro dos tempos das palavras contra os tempos
+verdadeiros e o pico de memória, e verifica a trava de ALIGN_MAX_FRAMES: com
+um limite menor que uma frase, o alinhamento devolve confiança 0 (o chamador
+usa o Whisper) em vez de montar matrizes de DTW gigantes.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.forced_alignment --minutes 10
+"""
+import os
+import time
+import wave
+import random
+import argparse
+import tempfile
+
+import numpy as np
+
+from utility.captions import forced_alignment
+from utility.captions.forced_alignment import align_script, syllable_count
+from utility.render.reader_pool import peak_rss_mb
+
+SAMPLE_RATE = 16000
+SYLLABLE_SECONDS = 0.17
+VOCABULARY = (
+    "o a de que e do da em um para com não uma os no se na por mais "
+    "governo mercado economia brasil país crescimento inflação juros dados "
+    "analistas segundo ano mês hoje novo primeiro trimestre recorde setor "
+    "exportações desaceleração população tecnologia investimento"
+).split()
+
+
+def synthetic_script(minutes: float, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    sentences = []
+    words = 0
+    # ~2,5 palavras por segundo de fala
+    while words < minutes * 60 * 2.5:
+        sentence = [rng.choice(VOCABULARY) for _ in range(rng.randint(8, 20))]
+        for i in range(3, len(sentence) - 3, 6):
+            if rng.random() < 0.4:
+                sentence[i] += ","
+        words += len(sentence)
+        sentences.append(" ".join(sentence).capitalize() + rng.choice(".!?"))
+    return " ".join(sentences)
+
+
+def synthesize(script: str, path: str, seed: int = 0) -> list:
+    """Grava a narração em `path` (WAV 16 kHz) e retorna [(início, fim)] verdadeiros por palavra."""
+    rng = np.random.default_rng(seed)
+    pieces = [np.zeros(int(0.5 * SAMPLE_RATE), np.float32)]
+    position = 0.5
+    truth = []
+    for token in script.split():
+        syllables = max(syllable_count(token), 1)
+        duration = syllables * SYLLABLE_SECONDS * rng.uniform(0.7, 1.3)
+        t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+        f0 = rng.uniform(100, 220) * (1 + 0.1 * np.sin(2 * np.pi * 3 * t))
+        phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+        voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+        envelope = 0.3 + 0.7 * np.abs(np.sin(np.pi * syllables * t / duration))
+        pieces.append((0.2 * envelope * voice).astype(np.float32))
+        truth.append((position, position + duration))
+        position += duration
+
+        gap = rng.uniform(0.0, 0.06)
+        if token[-1] in ".!?":
+            # uma em cada cinco frases emenda na seguinte quase sem pausa
+            gap += rng.uniform(0.05, 0.15) if rng.random() < 0.2 else rng.uniform(0.3, 0.7)
+        elif token[-1] == ",":
+            gap += rng.uniform(0.1, 0.35)
+        pieces.append(np.zeros(int(gap * SAMPLE_RATE), np.float32))
+        position += gap
+
+    samples = np.concatenate(pieces)
+    samples += 0.003 * rng.standard_normal(len(samples)).astype(np.float32)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes((np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes())
+    return truth
+
+
+def check_guard(path: str) -> None:
+    """Com limite menor que qualquer frase, não há onde cortar: confiança 0, sem DTW."""
+    saved = forced_alignment.ALIGN_MAX_FRAMES, forced_alignment.ALIGN_SEGMENT_FRAMES
+    forced_alignment.ALIGN_MAX_FRAMES, forced_alignment.ALIGN_SEGMENT_FRAMES = 40, 20
+    try:
+        analysis, confidence = align_script("uma frase longa sem pontuação nenhuma " * 40, path)
+    finally:
+        forced_alignment.ALIGN_MAX_FRAMES, forced_alignment.ALIGN_SEGMENT_FRAMES = saved
+    if confidence != 0.0 or analysis["segments"]:
+        raise SystemExit("trava de ALIGN_MAX_FRAMES não acionada")
+    print("trava de ALIGN_MAX_FRAMES: ok (confiança 0, cai no Whisper)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=10.0)
+    parser.add_argument("--max-error", type=float, default=0.15, help="Erro mediano máximo do início das palavras (s)")
+    parser.add_argument("--max-rss", type=float, default=1500.0, help="Pico de memória máximo (MB)")
+    args = parser.parse_args()
+
+    script = synthetic_script(args.minutes)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "narration.wav")
+        truth = synthesize(script, path)
+        check_guard(path)
+
+        started = time.perf_counter()
+        analysis, confidence = align_script(script, path)
+        seconds = time.perf_counter() - started
+        words = analysis["segments"][0]["words"] if analysis["segments"] else []
+        if len(words) != len(truth):
+            raise SystemExit(f"{len(words)} palavras alinhadas de {len(truth)}")
+
+        errors = np.array([abs(w["start"] - start) for w, (start, _) in zip(words, truth)])
+        rss = peak_rss_mb()
+        print(
+            f"{truth[-1][1]:.0f}s de áudio, {len(words)} palavras em {seconds:.1f}s; confiança {confidence:.2f}; "
+            f"erro do início: mediana {1000 * np.median(errors):.0f} ms, p90 {1000 * np.percentile(errors, 90):.0f} ms; "
+            + (f"pico de memória {rss:.0f} MB" if rss is not None else "pico de memória indisponível")
+        )
+        if np.median(errors) > args.max_error:
+            raise SystemExit("erro de alinhamento acima do limite")
+        if rss is not None and rss > args.max_rss:
+            raise SystemExit("pico de memória acima do limite")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Confere a retomada de downloads (utility.video.media_downloader) contra um
+http.server local que derruba a conexão no meio da transferência: cada
+arquivo tem de chegar íntegro, retomado com Range a partir do .part (mais vezes
+que MAX_RETRIES, já que cada retomada traz bytes novos), e o
+fetch_all do cache de mídia tem de passar pelo download_all (relatório de
+throughput), acertar o cache na segunda rodada e, com um orçamento menor
+que o lote, não podar as entradas que acabou de devolver. Um servidor que sempre
+derruba a conexão esgota as tentativas e aparece como falha no relatório.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.media_download --files 4 --seconds 2
+"""
+import os
+import re
+import hashlib
+import argparse
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utility.render.ffmpeg_utils import run_ffmpeg
+from utility.video import media_cache, media_downloader
+from utility.video.media_downloader import download_file
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Serve server.files; cada resposta é cortada após server.drop_after bytes (None = nunca)."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        data = self.server.files.get(self.path.split("?")[0])
+        if data is None:
+            self.send_error(404)
+            return
+        start = 0
+        match = re.match(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            self.server.ranges.append(start)
+            if start >= len(data):
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        body = data[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.server.drop_after is not None:
+            # envia só parte e fecha o socket sem completar o Content-Length
+            self.wfile.write(body[:self.server.drop_after])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+def start_server(files: dict, drop_after: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    server.files = files
+    server.drop_after = drop_after
+    server.ranges = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def synthetic_video(path: str, seconds: float, seed: int) -> bytes:
+    """MP4 de teste (ruído, para não comprimir) com alguns MB; retorna o conteúdo."""
+    run_ffmpeg([
+        "-f", "lavfi", "-i", f"testsrc2=size=640x360:rate=25,noise=alls=60:allf=t+u:all_seed={seed}",
+        "-t", f"{seconds:.3f}", "-c:v", "libx264", "-preset", "ultrafast", "-qp", "20",
+        "-pix_fmt", "yuv420p", path
+    ])
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=2.0, help="Duração de cada vídeo de teste")
+    args = parser.parse_args()
+    media_downloader.RETRY_BACKOFF = 0.01
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {
+            f"/video_{i}.mp4": synthetic_video(os.path.join(tmp, f"source_{i}.mp4"), args.seconds, i)
+            for i in range(args.files)
+        }
+        # cada resposta entrega ~15% do menor arquivo: bem mais retomadas que MAX_RETRIES,
+        # mas cada uma traz bytes novos, então o download tem de terminar
+        server = start_server(files, min(len(data) for data in files.values()) * 3 // 20)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+
+        # download_file isolado: íntegro, retomado a partir do .part mais vezes que MAX_RETRIES
+        target = os.path.join(tmp, "single.mp4")
+        result = download_file(base + "/video_0.mp4", target)
+        with open(target, "rb") as f:
+            if hashlib.sha1(f.read()).digest() != hashlib.sha1(files["/video_0.mp4"]).digest():
+                raise SystemExit("arquivo retomado difere do original")
+        if result["resumes"] <= media_downloader.MAX_RETRIES or not server.ranges or os.path.exists(target + ".part"):
+            raise SystemExit(f"retomada não exercitada: {result}, Range {server.ranges}")
+        print(f"download_file: {result['bytes'] / 1e6:.1f} MB íntegros após {result['resumes']} retomadas "
+              f"(Range a partir de {', '.join(str(r) for r in server.ranges)})")
+
+        # fetch_all pelo cache: tudo via download_all, em paralelo
+        media_cache.MEDIA_CACHE_DIR = os.path.join(tmp, "cache")
+        links = [base + path for path in files]
+        entries, report = media_cache.fetch_all(links)
+        print(f"fetch_all (frio): {media_cache.format_cache_report(report)}")
+        for link, path in zip(links, files):
+            with open(entries[link]["path"], "rb") as f:
+                if f.read() != files[path]:
+                    raise SystemExit(f"entrada do cache corrompida: {link}")
+        if report["misses"] != len(files) or len(report["downloads"]["files"]) != len(files):
+            raise SystemExit("fetch_all não passou pelo download_all")
+
+        entries, report = media_cache.fetch_all(links)
+        print(f"fetch_all (quente): {media_cache.format_cache_report(report)}")
+        if report["hits"] != len(files) or report["downloads"]["files"]:
+            raise SystemExit("segunda rodada não veio do cache")
+
+        # orçamento menor que o lote: a poda não pode apagar o que este lote devolveu
+        media_cache.MEDIA_CACHE_DIR = os.path.join(tmp, "small_cache")
+        media_cache.MEDIA_CACHE_MAX_BYTES = min(len(data) for data in files.values())
+        entries, report = media_cache.fetch_all(links)
+        missing = [link for link, entry in entries.items() if not (entry and os.path.exists(entry["path"]))]
+        print(f"fetch_all (orçamento de um arquivo): {len(links) - len(missing)}/{len(links)} caminhos válidos")
+        if missing:
+            raise SystemExit(f"poda apagou entradas do próprio lote: {missing}")
+
+        # servidor que nunca completa: esgota as tentativas e vira falha no relatório
+        server.drop_after = 0
+        entries, report = media_cache.fetch_all([base + "/video_0.mp4?sempre-cai"])
+        print(f"fetch_all (sempre cai): {media_cache.format_cache_report(report)}")
+        if report["failed"] != 1:
+            raise SystemExit("falha persistente não reportada")
+        if entries[base + "/video_0.mp4?sempre-cai"] is not None:
+            raise SystemExit("falha persistente virou entrada do cache")
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark da síntese TTS por frases em paralelo
+(utility.audio.audio_generator.generate_audio_concurrent) contra o stream
+único do roteiro inteiro, usando o TTS falso de benchmarks.fake_tts.
+Confere também que o WAV montado é a concatenação exata, amostra a amostra,
+do áudio de cada frase, e que as WordBoundary caem nos offsets certos.
+Por fim, edita uma frase do roteiro e mede a nova síntese com o cache de
+frases (utility.audio.tts_cache): só a frase alterada volta ao serviço.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.tts_concurrency --sentences 12 --concurrency 1 4 8
+"""
+import os
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+
+import numpy as np
+
+from benchmarks.fake_tts import FakeCommunicateFactory, synthesize_pcm
+from utility.audio import tts_cache
+from utility.audio.audio_generator import (
+    TTS_SAMPLE_RATE,
+    generate_audio_concurrent,
+    generate_audio_with_boundaries,
+    split_sentences
+)
+from utility.render.ffmpeg_utils import decode_pcm
+
+VOCABULARY = (
+    "governo mercado economia brasil país crescimento inflação juros dados "
+    "analistas segundo ano mês hoje novo primeiro trimestre recorde setor"
+).split()
+
+
+def synthetic_script(n_sentences: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    sentences = []
+    for _ in range(n_sentences):
+        words = [rng.choice(VOCABULARY) for _ in range(rng.randint(8, 16))]
+        sentences.append(" ".join(words).capitalize() + rng.choice(".!?"))
+    return " ".join(sentences)
+
+
+def edit_one_sentence(script: str) -> str:
+    sentences = split_sentences(script)
+    sentences[len(sentences) // 2] = "Esta frase foi reescrita pelo editor."
+    return " ".join(sentences)
+
+
+def check_stitching(script: str, output: str, result: dict) -> None:
+    """O WAV deve ser exatamente a concatenação das frases; frases e palavras, nos offsets delas."""
+    expected = []
+    expected_words = []
+    position = 0
+    for sentence, timing in zip(split_sentences(script), result["sentences"]):
+        samples, words = synthesize_pcm(sentence)
+        if abs(timing["start"] - position / TTS_SAMPLE_RATE) > 1e-9:
+            raise SystemExit(f"offset errado na frase: {sentence!r}")
+        expected_words += [position / TTS_SAMPLE_RATE + start for start, _, _ in words]
+        expected.append(samples)
+        position += len(samples)
+
+    written = np.round(decode_pcm(output, TTS_SAMPLE_RATE) * 32768).astype(np.int16)
+    if not np.array_equal(written, np.concatenate(expected)):
+        raise SystemExit("WAV montado difere da concatenação das frases")
+    drift = max(abs(b["start"] - s) for b, s in zip(result["boundaries"], expected_words))
+    if len(result["boundaries"]) != len(expected_words) or drift > 1e-6:
+        raise SystemExit("WordBoundary fora da posição esperada")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sentences", type=int, default=12)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--latency", type=float, default=0.3, help="Latência até o primeiro byte (s)")
+    parser.add_argument("--realtime-factor", type=float, default=5.0, help="Segundos de áudio por segundo de síntese")
+    args = parser.parse_args()
+
+    script = synthetic_script(args.sentences)
+    with tempfile.TemporaryDirectory() as tmp:
+        factory = FakeCommunicateFactory(args.latency, args.realtime_factor)
+        started = time.perf_counter()
+        asyncio.run(generate_audio_with_boundaries(
+            script, os.path.join(tmp, "single.wav"), communicate_factory=factory
+        ))
+        single_seconds = time.perf_counter() - started
+        print(f"stream único: {single_seconds:.2f}s")
+
+        for concurrency in args.concurrency:
+            output = os.path.join(tmp, f"concurrent_{concurrency}.wav")
+            factory = FakeCommunicateFactory(args.latency, args.realtime_factor)
+            result = asyncio.run(generate_audio_concurrent(
+                script, output, concurrency=concurrency, communicate_factory=factory, use_cache=False
+            ))
+            check_stitching(script, output, result)
+            audio_seconds = result["sentences"][-1]["end"]
+            print(
+                f"{len(result['sentences'])} frases, concorrência {concurrency}: {result['seconds']:.2f}s "
+                f"({single_seconds / result['seconds']:.2f}x o stream único; {audio_seconds:.1f}s de áudio; "
+                "montagem idêntica)"
+            )
+
+        # edição incremental: a mesma narração com uma frase trocada
+        tts_cache.TTS_CACHE_DIR = os.path.join(tmp, "tts_cache")
+        concurrency = max(args.concurrency)
+        output = os.path.join(tmp, "cached.wav")
+        for label, text in (("frio", script), ("editado", edit_one_sentence(script))):
+            factory = FakeCommunicateFactory(args.latency, args.realtime_factor)
+            result = asyncio.run(generate_audio_concurrent(
+                text, output, concurrency=concurrency, communicate_factory=factory, use_cache=True
+            ))
+            check_stitching(text, output, result)
+            print(
+                f"cache {label}: {result['seconds']:.2f}s, {len(factory.requests)} frase(s) sintetizada(s), "
+                f"{result['cached']} do cache"
+            )
+        stats = tts_cache.cache_stats()
+        print(f"cache: {stats['hits']} acertos, {stats['misses']} faltas")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark da transcrição na CPU: modelo Whisper em fp32 contra o mesmo
+modelo com quantização dinâmica int8 (utility.captions.model_registry).
+Cada variante roda num processo novo, para medir o pico de memória isolado.
+Compara latência, carga do modelo, pico de RSS e o desvio dos timestamps
+das palavras (e o WER) do int8 em relação ao fp32.
+
+Uso (na raiz do projeto):
+    python -m benchmarks.whisper_quantization audio.wav --model small --threads 4
+"""
+import time
+import argparse
+import difflib
+import multiprocessing
+
+import numpy as np
+
+from utility.captions.parallel_transcription import result_words, word_error_rate
+from utility.captions.word_matching import normalize_token
+
+OPTIONS = {"verbose": False, "fp16": False, "language": "pt"}
+
+
+def run_variant(audio: str, model_size: str, quantize: bool, threads: int, repeat: int) -> dict:
+    """Executado num processo à parte: carrega o modelo, transcreve `repeat` vezes."""
+    from utility.captions.model_registry import get_model, set_threads, transcribe
+    from utility.render.reader_pool import peak_rss_mb
+
+    set_threads(threads)
+    started = time.perf_counter()
+    get_model(model_size, device="cpu", quantize=quantize)
+    load_seconds = time.perf_counter() - started
+
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = transcribe(audio, model_size, device="cpu", quantize=quantize, **OPTIONS)
+        latencies.append(time.perf_counter() - started)
+    return {
+        "load_seconds": load_seconds,
+        "latency": min(latencies),
+        "peak_rss_mb": peak_rss_mb(),
+        "result": result,
+    }
+
+
+def timestamp_drift(reference: dict, candidate: dict) -> dict:
+    """Diferença de início/fim (s) das palavras iguais nas duas transcrições, pareadas por difflib."""
+    ref = [w for s in reference["segments"] for w in s["words"]]
+    cand = [w for s in candidate["segments"] for w in s["words"]]
+    matcher = difflib.SequenceMatcher(
+        a=[normalize_token(w["text"]) for w in ref],
+        b=[normalize_token(w["text"]) for w in cand],
+        autojunk=False
+    )
+    deltas = [
+        max(abs(ref[i + k]["start"] - cand[j + k]["start"]), abs(ref[i + k]["end"] - cand[j + k]["end"]))
+        for i, j, size in matcher.get_matching_blocks()
+        for k in range(size)
+    ]
+    if not deltas:
+        return {"matched": 0, "mean": float("nan"), "p90": float("nan"), "max": float("nan")}
+    return {
+        "matched": len(deltas),
+        "mean": float(np.mean(deltas)),
+        "p90": float(np.percentile(deltas, 90)),
+        "max": float(np.max(deltas)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("audio", help="Áudio de referência (ex.: uma narração gerada pelo TTS)")
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--threads", type=int, default=0, help="Threads do torch (0: padrão do torch)")
+    parser.add_argument("--repeat", type=int, default=2, help="Transcrições por variante (vale a mais rápida)")
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    runs = {}
+    for quantize in (False, True):
+        with context.Pool(1) as pool:
+            runs[quantize] = pool.apply(run_variant, (args.audio, args.model, quantize, args.threads, args.repeat))
+
+    fp32, int8 = runs[False], runs[True]
+    print(f"{'variante':>9} {'carga (s)':>10} {'latência (s)':>13} {'pico RSS (MB)':>14}")
+    for name, run in (("fp32", fp32), ("int8", int8)):
+        print(f"{name:>9} {run['load_seconds']:>10.2f} {run['latency']:>13.2f} {run['peak_rss_mb']:>14.0f}")
+
+    drift = timestamp_drift(fp32["result"], int8["result"])
+    wer = word_error_rate(result_words(fp32["result"]), result_words(int8["result"]))
+    print(f"speedup int8: {fp32['latency'] / int8['latency']:.2f}x")
+    print(
+        f"desvio dos timestamps ({drift['matched']} palavras pareadas): média {1000 * drift['mean']:.0f}ms, "
+        f"p90 {1000 * drift['p90']:.0f}ms, máx {1000 * drift['max']:.0f}ms; WER vs fp32 {100 * wer:.2f}%"
+    )
+
+
+if __name__ == '__main__':
+    main()
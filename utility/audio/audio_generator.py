@@ -1,7 +1,16 @@
 #!/usr/bin/env python3
 import os
+import re
+import time
+import wave
+import asyncio
+
+import numpy as np
 import edge_tts
 
+from utility.audio import tts_cache
+from utility.render.ffmpeg_utils import decode_pcm
+
 async def generate_audio(
     text: str,
     output_filename: str,
@@ -18,3 +27,146 @@ async def generate_audio(
         voice = os.getenv('TTS_VOICE', 'pt-BR-AntonioNeural')
     communicate = edge_tts.Communicate(text, voice)
     await communicate.save(output_filename)
+
+
+# edge-tts informa offset/duração em unidades de 100ns
+TICKS_PER_SECOND = 10_000_000
+# Frases sintetizadas ao mesmo tempo (conexões simultâneas ao serviço de TTS)
+TTS_CONCURRENCY = int(os.getenv('TTS_CONCURRENCY', '4'))
+# Taxa do WAV montado a partir das frases (a do mp3 do edge-tts)
+TTS_SAMPLE_RATE = 24000
+# Velocidade e tom da voz no formato do edge-tts
+TTS_RATE = os.getenv('TTS_RATE', '+0%')
+TTS_PITCH = os.getenv('TTS_PITCH', '+0Hz')
+
+
+def _boundary(chunk: dict, offset: float = 0.0) -> dict:
+    start = offset + chunk["offset"] / TICKS_PER_SECOND
+    return {"start": start, "end": start + chunk["duration"] / TICKS_PER_SECOND, "text": chunk["text"]}
+
+
+async def generate_audio_with_boundaries(
+    text: str,
+    output_filename: str,
+    voice: str = None,
+    communicate_factory=None
+) -> list:
+    """
+    Como generate_audio, mas consome o stream do edge-tts e guarda os eventos
+    WordBoundary em vez de descartá-los.
+    Retorna [{'start', 'end', 'text'}, ...] em segundos, na ordem da fala.
+    communicate_factory(text, voice) substitui edge_tts.Communicate (ex.: um
+    stream falso em testes); precisa expor um gerador assíncrono stream().
+    """
+    if voice is None:
+        voice = os.getenv('TTS_VOICE', 'pt-BR-AntonioNeural')
+    communicate_factory = communicate_factory or edge_tts.Communicate
+    communicate = communicate_factory(text, voice)
+
+    boundaries = []
+    with open(output_filename, "wb") as f:
+        async for chunk in communicate.stream():
+            if chunk["type"] == "audio":
+                f.write(chunk["data"])
+            elif chunk["type"] == "WordBoundary":
+                boundaries.append(_boundary(chunk))
+    return boundaries
+
+
+def split_sentences(text: str) -> list:
+    """Frases do roteiro, quebradas após . ! ? ou …"""
+    return [s for s in re.split(r'(?<=[.!?…])\s+', text.strip()) if s]
+
+
+async def synthesize_sentence(
+    text: str,
+    voice: str,
+    communicate_factory=None,
+    rate: str = TTS_RATE,
+    pitch: str = TTS_PITCH
+) -> tuple:
+    """
+    Sintetiza uma frase em memória e decodifica para PCM int16 mono.
+    Retorna (amostras, [WordBoundary relativas ao início da frase]).
+    """
+    communicate_factory = communicate_factory or edge_tts.Communicate
+    communicate = communicate_factory(text, voice, rate=rate, pitch=pitch)
+    data = bytearray()
+    boundaries = []
+    async for chunk in communicate.stream():
+        if chunk["type"] == "audio":
+            data.extend(chunk["data"])
+        elif chunk["type"] == "WordBoundary":
+            boundaries.append(_boundary(chunk))
+    # decodificação fora do loop de eventos: as outras frases seguem baixando
+    samples = await asyncio.to_thread(decode_pcm, None, TTS_SAMPLE_RATE, bytes(data))
+    return np.round(samples * 32768).clip(-32768, 32767).astype(np.int16), boundaries
+
+
+async def generate_audio_concurrent(
+    text: str,
+    output_filename: str,
+    voice: str = None,
+    concurrency: int = TTS_CONCURRENCY,
+    communicate_factory=None,
+    rate: str = TTS_RATE,
+    pitch: str = TTS_PITCH,
+    use_cache: bool = tts_cache.TTS_CACHE_ENABLED
+) -> dict:
+    """
+    Sintetiza as frases do roteiro em paralelo (no máximo `concurrency` ao
+    mesmo tempo) e as concatena em ordem, amostra a amostra, num WAV PCM.
+    Com use_cache, frases já sintetizadas com a mesma voz/velocidade/tom
+    vêm do disco (tts_cache) e só as novas ou alteradas vão ao serviço.
+    Retorna {'sentences': [{'start', 'end', 'text'}], 'boundaries': [...],
+    'seconds', 'cached'}: os tempos de cada frase saem das contagens de
+    amostras, e as WordBoundary já vêm deslocadas para a linha do tempo do arquivo.
+    """
+    if voice is None:
+        voice = os.getenv('TTS_VOICE', 'pt-BR-AntonioNeural')
+    sentences = split_sentences(text)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    cached = 0
+
+    async def run(sentence: str) -> tuple:
+        nonlocal cached
+        key = tts_cache.sentence_key(sentence, voice, rate, pitch, TTS_SAMPLE_RATE) if use_cache else None
+        if key is not None:
+            hit = tts_cache.lookup(key)
+            if hit is not None:
+                cached += 1
+                return hit
+        async with semaphore:
+            samples, boundaries = await synthesize_sentence(sentence, voice, communicate_factory, rate, pitch)
+        if key is not None:
+            await asyncio.to_thread(tts_cache.store, key, samples, boundaries)
+        return samples, boundaries
+
+    started = time.monotonic()
+    results = await asyncio.gather(*(run(sentence) for sentence in sentences))
+
+    timeline = []
+    boundaries = []
+    position = 0
+    for sentence, (samples, sentence_boundaries) in zip(sentences, results):
+        offset = position / TTS_SAMPLE_RATE
+        position += len(samples)
+        timeline.append({"start": offset, "end": position / TTS_SAMPLE_RATE, "text": sentence})
+        boundaries.extend(
+            {"start": b["start"] + offset, "end": b["end"] + offset, "text": b["text"]}
+            for b in sentence_boundaries
+        )
+
+    pcm = np.concatenate([samples for samples, _ in results]) if results else np.zeros(0, np.int16)
+    with wave.open(output_filename, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(TTS_SAMPLE_RATE)
+        f.writeframes(pcm.tobytes())
+    return {
+        "sentences": timeline,
+        "boundaries": boundaries,
+        "seconds": time.monotonic() - started,
+        "cached": cached,
+    }
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+import os
+import hashlib
+import threading
+
+import numpy as np
+from scipy.signal import resample_poly
+
+from utility.render.ffmpeg_utils import run_ffmpeg
+
+# PCM decodificado da narração (s16le mono) e o AAC usado no mux, por arquivo de origem
+NARRATION_CACHE_DIR = os.getenv('NARRATION_CACHE_DIR', '.cache/narration')
+# Taxa do buffer: a do TTS (edge-tts gera 24 kHz); o Whisper recebe uma cópia em 16 kHz
+NARRATION_SAMPLE_RATE = 24000
+NARRATION_AUDIO_BITRATE = '128k'
+# Orçamento de disco do diretório; narrações usadas há mais tempo saem primeiro
+NARRATION_CACHE_MAX_BYTES = int(os.getenv('NARRATION_CACHE_MAX_BYTES', str(1024 ** 3)))
+
+_buffers = {}
+_buffers_lock = threading.Lock()
+
+
+def _source_key(path: str) -> str:
+    """Identifica o arquivo de origem por caminho, tamanho e mtime (sem ler o conteúdo)."""
+    st = os.stat(path)
+    identity = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}|{NARRATION_SAMPLE_RATE}"
+    return hashlib.sha1(identity.encode('utf-8')).hexdigest()
+
+
+class NarrationBuffer:
+    """
+    Narração decodificada uma única vez para um arquivo PCM s16le mapeado em
+    memória. Transcrição, alinhamento e render leem daqui; processos filhos
+    reabrem o mesmo arquivo pelo caminho, sem decodificar de novo.
+    """
+
+    def __init__(self, source: str, pcm_path: str, sample_rate: int = NARRATION_SAMPLE_RATE):
+        self.source = source
+        self.pcm_path = pcm_path
+        self.sample_rate = sample_rate
+        self.samples = np.memmap(pcm_path, dtype=np.int16, mode='r')
+        self._resampled = {}
+        self._aac_path = None
+        self._lock = threading.Lock()
+
+    @property
+    def duration(self) -> float:
+        """Duração exata, pela contagem de amostras."""
+        return len(self.samples) / self.sample_rate
+
+    def pcm(self, sample_rate: int = 16000) -> np.ndarray:
+        """
+        PCM mono float32 em [-1, 1] na taxa pedida (16 kHz = entrada do
+        Whisper). Reamostrado em memória uma vez por taxa.
+        """
+        with self._lock:
+            samples = self._resampled.get(sample_rate)
+            if samples is None:
+                samples = self.samples.astype(np.float32) / 32768.0
+                if sample_rate != self.sample_rate:
+                    g = np.gcd(sample_rate, self.sample_rate)
+                    samples = resample_poly(samples, sample_rate // g, self.sample_rate // g).astype(np.float32)
+                self._resampled[sample_rate] = samples
+            return samples
+
+    def ffmpeg_input(self) -> list:
+        """Argumentos de entrada do ffmpeg que leem o buffer direto (PCM cru)."""
+        return ["-f", "s16le", "-ar", str(self.sample_rate), "-ac", "1", "-i", self.pcm_path]
+
+    def aac(self) -> str:
+        """
+        Trilha AAC codificada uma única vez a partir do buffer; os backends de
+        render a copiam para o mp4 (-c:a copy) em vez de recodificar.
+        """
+        with self._lock:
+            if self._aac_path is None:
+                path = os.path.splitext(self.pcm_path)[0] + ".m4a"
+                if not os.path.exists(path):
+                    tmp_path = f"{path}.{os.getpid()}.tmp.m4a"
+                    try:
+                        run_ffmpeg(self.ffmpeg_input() + ["-c:a", "aac", "-b:a", NARRATION_AUDIO_BITRATE, tmp_path])
+                        os.replace(tmp_path, path)
+                    finally:
+                        if os.path.exists(tmp_path):
+                            os.remove(tmp_path)
+                self._aac_path = path
+            return self._aac_path
+
+
+def evict(keep: str = None, max_bytes: int = NARRATION_CACHE_MAX_BYTES) -> int:
+    """Remove buffers (e seus .m4a) usados há mais tempo até caber em max_bytes, exceto `keep`."""
+    if not os.path.isdir(NARRATION_CACHE_DIR):
+        return 0
+    entries = []
+    for name in os.listdir(NARRATION_CACHE_DIR):
+        key, ext = os.path.splitext(name)
+        if ext not in ('.s16le', '.m4a') or '.tmp' in name:
+            continue
+        path = os.path.join(NARRATION_CACHE_DIR, name)
+        try:
+            entries.append((os.path.getmtime(path), os.path.getsize(path), key, path))
+        except OSError:
+            continue
+
+    total = sum(size for _, size, _, _ in entries)
+    freed = 0
+    for _, size, key, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if key == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        freed += size
+    return freed
+
+
+def load_narration(path: str) -> NarrationBuffer:
+    """
+    Buffer compartilhado da narração em `path`: decodifica na primeira chamada
+    (neste ou em outro processo) e devolve o mesmo objeto nas seguintes.
+    """
+    key = _source_key(path)
+    with _buffers_lock:
+        buffer = _buffers.get(key)
+        if buffer is not None:
+            return buffer
+
+        os.makedirs(NARRATION_CACHE_DIR, exist_ok=True)
+        pcm_path = os.path.join(NARRATION_CACHE_DIR, f"{key}.s16le")
+        if not os.path.exists(pcm_path):
+            tmp_path = f"{pcm_path}.{os.getpid()}.tmp"
+            try:
+                run_ffmpeg([
+                    "-i", path, "-vn", "-ac", "1", "-ar", str(NARRATION_SAMPLE_RATE),
+                    "-f", "s16le", "-acodec", "pcm_s16le", tmp_path
+                ])
+                os.replace(tmp_path, pcm_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            evict(keep=key)
+        else:
+            # o mtime marca o último uso (LRU)
+            os.utime(pcm_path)
+        buffer = NarrationBuffer(path, pcm_path)
+        _buffers[key] = buffer
+    return buffer
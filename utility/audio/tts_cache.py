@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+import os
+import re
+import json
+import hashlib
+
+import numpy as np
+
+# Áudio já sintetizado por frase (PCM int16 + WordBoundary, .npz)
+TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', '.cache/tts')
+# Orçamento de disco; entradas menos usadas saem primeiro
+TTS_CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_BYTES', str(500 * 1024 ** 2)))
+# TTS_CACHE=0 desliga o cache
+TTS_CACHE_ENABLED = os.getenv('TTS_CACHE', '1') == '1'
+
+_stats = {"hits": 0, "misses": 0, "evicted_bytes": 0}
+
+
+def normalize_text(text: str) -> str:
+    """Espaços colapsados; caixa e pontuação ficam (mudam a entonação)."""
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def sentence_key(text: str, voice: str, rate: str, pitch: str, sample_rate: int) -> str:
+    """Chave: texto normalizado + voz + velocidade/tom + taxa do PCM."""
+    identity = {
+        "text": normalize_text(text),
+        "voice": voice,
+        "rate": rate,
+        "pitch": pitch,
+        "sample_rate": sample_rate,
+    }
+    return hashlib.sha1(json.dumps(identity, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(TTS_CACHE_DIR, f"{key}.npz")
+
+
+def lookup(key: str):
+    """(amostras, boundaries) guardados para a chave, ou None."""
+    path = _entry_path(key)
+    try:
+        with np.load(path) as entry:
+            samples = entry["samples"]
+            boundaries = json.loads(str(entry["boundaries"]))
+        # o mtime marca o último uso (LRU)
+        os.utime(path)
+    except (OSError, ValueError, KeyError):
+        _stats["misses"] += 1
+        return None
+    _stats["hits"] += 1
+    return samples, boundaries
+
+
+def store(key: str, samples: np.ndarray, boundaries: list) -> str:
+    """Grava a frase de forma atômica e aplica o orçamento de disco."""
+    os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+    path = _entry_path(key)
+    # o np.savez acrescenta .npz a nomes sem essa extensão
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    try:
+        np.savez(tmp_path, samples=samples, boundaries=np.array(json.dumps(boundaries, ensure_ascii=False)))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict()
+    return path
+
+
+def evict(max_bytes: int = TTS_CACHE_MAX_BYTES) -> int:
+    """Remove as frases usadas há mais tempo até caber em max_bytes. Retorna os bytes liberados."""
+    if not os.path.isdir(TTS_CACHE_DIR):
+        return 0
+    entries = []
+    for name in os.listdir(TTS_CACHE_DIR):
+        if not name.endswith('.npz') or '.tmp' in name:
+            continue
+        path = os.path.join(TTS_CACHE_DIR, name)
+        try:
+            entries.append((os.path.getmtime(path), os.path.getsize(path), path))
+        except OSError:
+            continue
+
+    total = sum(size for _, size, _ in entries)
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        freed += size
+    _stats["evicted_bytes"] += freed
+    return freed
+
+
+def cache_stats() -> dict:
+    """Acertos, faltas e bytes removidos do cache neste processo."""
+    return dict(_stats)
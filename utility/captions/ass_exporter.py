@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+import os
+
+from utility.captions.word_matching import match_phrase_words
+
+# Estilo padrão (equivalente às legendas karaokê do render_karaoke)
+default_font_name = os.getenv('ASS_FONT_NAME', 'DejaVu Sans')
+PRIMARY_COLOUR = '&H0000FFFF'    # amarelo: palavra já falada / ativa
+SECONDARY_COLOUR = '&H00FFFFFF'  # branco: palavra ainda não falada
+OUTLINE_COLOUR = '&H00000000'    # contorno preto
+
+
+def ass_timestamp(seconds: float) -> str:
+    """Formata segundos no padrão ASS H:MM:SS.cc."""
+    cs = max(0, int(round(seconds * 100)))
+    h, cs = divmod(cs, 360000)
+    m, cs = divmod(cs, 6000)
+    s, cs = divmod(cs, 100)
+    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+def escape_ass_text(text: str) -> str:
+    """Remove caracteres que o libass interpretaria como tags."""
+    return text.replace('\\', '/').replace('{', '(').replace('}', ')').replace('\n', ' ')
+
+
+def karaoke_line(t1: float, t2: float, text: str, words: list) -> str:
+    """
+    Monta o texto de uma Dialogue com tags \\k (em centésimos de segundo).
+    Intervalos sem fala viram sílabas vazias para manter a sincronia.
+    """
+    tokens = text.split()
+    phrase_words = [w for w in words if t1 <= w["start"] < t2]
+    matches = match_phrase_words(tokens, phrase_words)
+    starts = {}
+    for w, idx in zip(phrase_words, matches):
+        if idx is not None:
+            starts[idx] = max(w["start"], t1)
+
+    # tokens sem palavra correspondente são interpolados entre os vizinhos
+    anchors = sorted(starts.items())
+    if 0 not in starts:
+        anchors.insert(0, (0, t1))
+    anchors.append((len(tokens), t2))
+    token_starts = []
+    for (i0, s0), (i1, s1) in zip(anchors, anchors[1:]):
+        for i in range(i0, i1):
+            token_starts.append(s0 + (s1 - s0) * (i - i0) / (i1 - i0))
+
+    parts = []
+    elapsed = 0  # centésimos já consumidos desde t1
+    if token_starts and token_starts[0] > t1:
+        lead = int(round((token_starts[0] - t1) * 100))
+        parts.append(f"{{\\k{lead}}}")
+        elapsed += lead
+    for i, token in enumerate(tokens):
+        end = token_starts[i + 1] if i + 1 < len(tokens) else t2
+        target = int(round((end - t1) * 100))
+        duration = max(0, target - elapsed)
+        elapsed += duration
+        sep = ' ' if i + 1 < len(tokens) else ''
+        parts.append(f"{{\\k{duration}}}{escape_ass_text(token)}{sep}")
+    return ''.join(parts)
+
+
+def export_ass(
+    captions: list,
+    words: list,
+    output_path: str,
+    width: int = 1920,
+    height: int = 1080,
+    font_size: int = 48,
+    font_name: str = default_font_name
+) -> str:
+    """
+    Exporta captions/words (saída de karaoke_generator.generate_timed_captions)
+    como arquivo .ass com tempos de palavra em tags \\k.
+    Serve para burn-in com o filtro subtitles do ffmpeg ou como faixa sidecar.
+    """
+    margin_lr = int(width * 0.1)
+    margin_v = font_size // 2
+    header = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 0",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, "
+        "BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, "
+        "BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Karaoke,{font_name},{font_size},{PRIMARY_COLOUR},{SECONDARY_COLOUR},"
+        f"{OUTLINE_COLOUR},&H00000000,-1,0,0,0,100,100,0,0,1,2,0,2,"
+        f"{margin_lr},{margin_lr},{margin_v},1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    events = []
+    for (t1, t2), txt in captions:
+        events.append(
+            f"Dialogue: 0,{ass_timestamp(t1)},{ass_timestamp(t2)},Karaoke,,0,0,0,,"
+            f"{karaoke_line(t1, t2, txt, words)}"
+        )
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(header + events) + '\n')
+    return output_path
+
+
+if __name__ == '__main__':
+    import sys
+    from utility.captions.karaoke_generator import generate_timed_captions
+    if len(sys.argv) < 3:
+        print('Uso: python ass_exporter.py audio.mp3 saida.ass')
+        sys.exit(1)
+    frases, palavras = generate_timed_captions(sys.argv[1])
+    print(export_ass(frases, palavras, sys.argv[2]))
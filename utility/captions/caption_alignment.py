@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+import re
+from bisect import bisect_left
+
+
+def clean_word(word: str) -> str:
+    # preserva caracteres de palavras em PT (acentos) e hífens
+    return re.sub(r"[^\wÀ-ÿ\s\-_'\"]", "", word)
+
+
+def split_words_by_size(words, max_caption_size: int):
+    """
+    Agrupa as palavras em legendas de até max_caption_size caracteres,
+    fechando a legenda assim que passa da metade. Percorre a lista por
+    índice (sem pop(0)), em tempo linear.
+    """
+    half_size = max_caption_size / 2
+    captions = []
+    i, n = 0, len(words)
+    while i < n:
+        caption = words[i]
+        i += 1
+        while i < n and len(caption) + 1 + len(words[i]) <= max_caption_size:
+            caption += ' ' + words[i]
+            i += 1
+            if len(caption) >= half_size and i < n:
+                break
+        captions.append(caption)
+    return captions
+
+
+def get_timestamp_mapping(whisper_analysis: dict) -> dict:
+    """
+    Offsets de caractere acumulados das palavras do Whisper, em ordem:
+    a palavra k ocupa [starts[k], ends[k]] e termina em times[k].
+    Retorna {'starts', 'ends', 'times'}.
+    """
+    starts, ends, times = [], [], []
+    index = 0
+    for segment in whisper_analysis.get('segments', []):
+        for word in segment.get('words', []):
+            end_idx = index + len(word['text']) + 1
+            starts.append(index)
+            ends.append(end_idx)
+            times.append(word.get('end'))
+            index = end_idx
+    return {"starts": starts, "ends": ends, "times": times}
+
+
+def interpolate_time(position: int, mapping: dict):
+    """
+    Fim da primeira palavra cujo intervalo [start, end] contém position
+    (busca binária: os intervalos são contíguos e crescentes).
+    """
+    k = bisect_left(mapping["ends"], position)
+    if k < len(mapping["ends"]) and mapping["starts"][k] <= position:
+        return mapping["times"][k]
+    return None
+
+
+def get_captions_with_time(
+    whisper_analysis: dict,
+    max_caption_size: int,
+    consider_punctuation: bool
+):
+    word_map = get_timestamp_mapping(whisper_analysis)
+    position = 0
+    start_time = 0
+    captions = []
+    text = whisper_analysis.get('text', '')
+
+    # Quebra em palavras agrupadas
+    if consider_punctuation:
+        sentences = re.split(r'(?<=[.!?]) +', text)
+        chunks = []
+        for sentence in sentences:
+            words = sentence.split()
+            cleaned = [clean_word(w) for w in words]
+            chunks.extend(split_words_by_size(cleaned, max_caption_size))
+    else:
+        words = text.split()
+        cleaned = [clean_word(w) for w in words]
+        chunks = split_words_by_size(cleaned, max_caption_size)
+
+    # Atribui timestamps a cada chunk
+    for chunk in chunks:
+        position += len(chunk) + 1
+        end_time = interpolate_time(position, word_map)
+        if end_time is not None and chunk:
+            captions.append(((start_time, end_time), chunk))
+            start_time = end_time
+    return captions
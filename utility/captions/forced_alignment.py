@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+import os
+import re
+import time
+
+import numpy as np
+from dtw import dtw
+
+from utility.audio.narration import load_narration
+from utility.captions.caption_alignment import clean_word, get_captions_with_time
+from utility.captions.karaoke_generator import (
+    CONSIDER_PUNCTUATION,
+    MAX_CAPTION_SIZE,
+    default_model_size,
+    generate_timed_captions,
+    normalize_captions
+)
+from utility.captions.parallel_transcription import SAMPLE_RATE, frame_energy
+from utility.captions.word_matching import normalize_token
+
+# Resolução do alinhamento (s); a matriz do DTW cresce com o quadrado do nº de quadros
+ALIGN_FRAME_SECONDS = 0.025
+# Pausas esperadas após pontuação (s), antes de escalar o molde para o áudio
+SHORT_PAUSE_SECONDS = 0.2
+LONG_PAUSE_SECONDS = 0.45
+# Pequena queda de energia esperada entre palavras (s)
+WORD_GAP_SECONDS = 0.04
+# Silêncio mínimo (s) que conta como pausa na verificação do alinhamento
+MIN_PAUSE_SECONDS = 0.15
+# Largura da faixa de Sakoe-Chiba, em fração da duração (mínimo em segundos)
+ALIGN_WINDOW_FRACTION = 0.15
+ALIGN_MIN_WINDOW_SECONDS = 2.0
+# Maior nº de quadros de áudio num único DTW: o dtw-python aloca matrizes
+# N×M completas mesmo com janela (~38 bytes por célula; 2400 quadros ≈ 220 MB)
+ALIGN_MAX_FRAMES = int(os.getenv('FORCED_ALIGNMENT_MAX_FRAMES', '2400'))
+# Acima do limite, o áudio é alinhado em trechos de ~metade dele, cortados em fins de frase
+ALIGN_SEGMENT_FRAMES = ALIGN_MAX_FRAMES // 2
+# Distância máxima (s) entre o corte estimado e o silêncio em que ele é ajustado
+SNAP_SECONDS = 1.0
+# Abaixo desta confiança (0..1) o alinhamento é descartado e o Whisper transcreve
+MIN_ALIGNMENT_CONFIDENCE = float(os.getenv('FORCED_ALIGNMENT_MIN_CONFIDENCE', '0.8'))
+
+_VOWELS = re.compile(r"[aeiouyáéíóúâêôãõàü]+")
+
+
+def syllable_count(token: str) -> int:
+    """Estimativa de sílabas (grupos de vogais; cada dígito conta como duas)."""
+    word = normalize_token(token)
+    if not word:
+        return 0
+    digits = sum(ch.isdigit() for ch in word)
+    return max(1, len(_VOWELS.findall(word)) + 2 * digits)
+
+
+def speech_envelope(samples: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                    frame_seconds: float = ALIGN_FRAME_SECONDS) -> np.ndarray:
+    """
+    Energia em dB por quadro, normalizada para [0, 1] entre o piso de
+    ruído (percentil 10) e o pico (percentil 95): ~0 em pausas, ~1 em fala.
+    """
+    energy = frame_energy(samples, sample_rate, frame_seconds)
+    if not len(energy):
+        return energy
+    db = 20 * np.log10(energy + 1e-5)
+    floor, peak = np.percentile(db, 10), np.percentile(db, 95)
+    if peak - floor < 1e-3:
+        return np.zeros_like(db)
+    envelope = np.clip((db - floor) / (peak - floor), 0.0, 1.0)
+    return np.convolve(envelope, np.ones(3) / 3, mode="same")
+
+
+def script_template(tokens: list, frames: int, frame_seconds: float = ALIGN_FRAME_SECONDS) -> tuple:
+    """
+    Envelope esperado para o roteiro com `frames` quadros de frame_seconds:
+    1 durante as palavras (proporcional às sílabas), 0 nas pausas de
+    pontuação e numa breve queda entre palavras.
+    Retorna (molde, [(quadro_inicial, quadro_final), ...] por token).
+    """
+    durations = []
+    for token in tokens:
+        pause = 0.0
+        if token[-1] in ".!?":
+            pause = LONG_PAUSE_SECONDS
+        elif token[-1] in ",;:":
+            pause = SHORT_PAUSE_SECONDS
+        durations.append((syllable_count(token), pause + WORD_GAP_SECONDS))
+
+    syllables = sum(s for s, _ in durations)
+    pauses = sum(p for _, p in durations)
+    # a duração da sílaba é a que faz o molde ocupar todo o trecho de fala
+    syllable_seconds = max(frames * frame_seconds - pauses, 0.0) / max(syllables, 1)
+
+    spans = []
+    position = 0.0
+    for count, pause in durations:
+        start = position
+        position += count * syllable_seconds
+        spans.append((int(round(start / frame_seconds)), int(round(position / frame_seconds))))
+        position += pause
+
+    values = np.zeros(frames, dtype=np.float64)
+    for (first, last), (count, _) in zip(spans, durations):
+        if count:
+            values[first:min(last, frames)] = 1.0
+    return values, spans
+
+
+def _runs(mask: np.ndarray, min_length: int) -> list:
+    """Trechos [início, fim) em que mask é verdadeiro por pelo menos min_length quadros."""
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    return [(s, e) for s, e in zip(starts, ends) if e - s >= min_length]
+
+
+def pause_agreement(template: np.ndarray, audio: np.ndarray, path_t: np.ndarray, path_a: np.ndarray) -> float:
+    """
+    Confiança do alinhamento: F1 entre as pausas de pontuação do molde
+    (levadas pelo caminho do DTW) e os silêncios do áudio. Um roteiro que
+    não é o narrado deixa pausas caindo em fala e silêncios sem pausa.
+    """
+    min_length = int(MIN_PAUSE_SECONDS / ALIGN_FRAME_SECONDS)
+    silences = _runs(audio < 0.3, min_length)
+    pauses = _runs(template == 0, min_length)
+    if not silences or not pauses:
+        return 0.0
+
+    owner = np.full(len(audio), -1)
+    for i, (start, end) in enumerate(silences):
+        owner[start:end] = i
+    matched = 0
+    covered = set()
+    for start, end in pauses:
+        center = path_a[np.searchsorted(path_t, (start + end) // 2)]
+        if owner[center] >= 0:
+            matched += 1
+            covered.add(owner[center])
+
+    precision = matched / len(pauses)
+    recall = len(covered) / len(silences)
+    return 2 * precision * recall / (precision + recall) if matched else 0.0
+
+
+def _align_segment(tokens: list, audio: np.ndarray, frame_seconds: float = ALIGN_FRAME_SECONDS) -> tuple:
+    """
+    DTW entre um trecho do envelope e o molde dos seus tokens; o molde tem
+    silêncio onde o trecho começa/termina sem fala. Retorna (molde, path_t,
+    path_a, [(quadro_inicial, quadro_final)] por token), em quadros do trecho.
+    """
+    voiced = np.flatnonzero(audio > 0.5)
+    first, last = (int(voiced[0]), int(voiced[-1]) + 1) if len(voiced) >= 2 else (0, len(audio))
+    core, spans = script_template(tokens, last - first, frame_seconds)
+    template = np.concatenate([np.zeros(first), core, np.zeros(len(audio) - last)])
+
+    window = max(int(ALIGN_WINDOW_FRACTION * len(audio)), int(ALIGN_MIN_WINDOW_SECONDS / frame_seconds))
+    alignment = dtw(
+        template.reshape(-1, 1), audio.reshape(-1, 1),
+        dist_method="cityblock",
+        # inclinação limitada (1/2..2): sem ela trechos planos do envelope colapsam palavras
+        step_pattern="symmetricP1",
+        window_type="sakoechiba",
+        window_args={"window_size": window}
+    )
+    path_t, path_a = alignment.index1, alignment.index2
+
+    frames = []
+    for start, end in spans:
+        start = min(first + start, last - 1)
+        end = min(max(first + end, start + 1), last)
+        # o caminho é monótono: primeiro quadro de áudio do início, último do fim
+        a0 = path_a[np.searchsorted(path_t, start, 'left')]
+        a1 = path_a[np.searchsorted(path_t, end - 1, 'right') - 1] + 1
+        frames.append((int(a0), int(a1)))
+    return template, path_t, path_a, frames
+
+
+def plan_segments(tokens: list, audio: np.ndarray) -> list:
+    """
+    Divide um áudio longo demais para um único DTW em trechos de ~ALIGN_SEGMENT_FRAMES,
+    da esquerda para a direita: cada janela de áudio é alinhada (DTW de fim
+    aberto) ao molde a partir do primeiro token ainda não alocado, e o corte
+    cai no fim de frase mais perto do tamanho alvo, ajustado ao silêncio
+    mais próximo. Se não houver fim de frase na janela, o resto fica num
+    trecho só (maior que o limite; align_script cai no Whisper).
+    Retorna [(token_inicial, token_final, quadro_inicial, quadro_final), ...].
+    """
+    template, spans = script_template(tokens, len(audio))
+    silences = _runs(audio < 0.3, int(MIN_PAUSE_SECONDS / ALIGN_FRAME_SECONDS))
+    centers = np.array([(start + end) // 2 for start, end in silences])
+    snap = SNAP_SECONDS / ALIGN_FRAME_SECONDS
+    # janela de áudio × molde: 3/4 de ALIGN_MAX_FRAMES² células
+    window = 3 * ALIGN_MAX_FRAMES // 4
+
+    segments = []
+    i0, c0 = 0, 0
+    while len(audio) - c0 > ALIGN_MAX_FRAMES:
+        t0 = spans[i0][0]
+        alignment = dtw(
+            audio[c0:c0 + window].reshape(-1, 1), template[t0:t0 + ALIGN_MAX_FRAMES].reshape(-1, 1),
+            dist_method="cityblock",
+            step_pattern="symmetricP1",
+            window_type="sakoechiba",
+            window_args={"window_size": int(ALIGN_WINDOW_FRACTION * window)},
+            open_end=True
+        )
+        path_a, path_t = alignment.index1, alignment.index2
+
+        best = None
+        for i in range(i0, len(tokens) - 1):
+            end = spans[i][1] - t0
+            if end > path_t[-1]:
+                break
+            if tokens[i][-1] not in ".!?":
+                continue
+            cut = c0 + int(path_a[np.searchsorted(path_t, end - 1, 'right') - 1]) + 1
+            if len(centers):
+                nearest = int(centers[np.argmin(np.abs(centers - cut))])
+                if abs(nearest - cut) <= snap:
+                    cut = nearest
+            if not c0 + ALIGN_SEGMENT_FRAMES // 2 <= cut <= c0 + window:
+                continue
+            if best is None or abs(cut - c0 - ALIGN_SEGMENT_FRAMES) < abs(best[1] - c0 - ALIGN_SEGMENT_FRAMES):
+                best = (i + 1, cut)
+        if best is None:
+            break
+        segments.append((i0, best[0], c0, best[1]))
+        i0, c0 = best
+    segments.append((i0, len(tokens), c0, len(audio)))
+    return segments
+
+
+def align_script(script: str, audio_filename: str) -> tuple:
+    """
+    Alinha as palavras do roteiro ao áudio com DTW entre o envelope de
+    energia do áudio e o envelope esperado do texto. Acima de
+    ALIGN_MAX_FRAMES o alinhamento é feito por trechos (plan_segments); se
+    algum trecho ainda passar do limite, retorna confiança 0 (o chamador
+    usa o Whisper).
+    Retorna (análise no formato do transcribe_timestamped, confiança 0..1).
+    """
+    tokens = script.split()
+    samples = load_narration(audio_filename).pcm(SAMPLE_RATE)
+    envelope = speech_envelope(samples)
+    voiced = np.flatnonzero(envelope > 0.5)
+    if not tokens or len(voiced) < 2:
+        return {"text": " ".join(tokens), "segments": []}, 0.0
+
+    # só o trecho entre a primeira e a última fala entra no DTW
+    first, last = int(voiced[0]), int(voiced[-1]) + 1
+    audio = envelope[first:last]
+    if len(audio) <= ALIGN_MAX_FRAMES:
+        segments = [(0, len(tokens), 0, len(audio))]
+    else:
+        segments = plan_segments(tokens, audio)
+        longest = max(c1 - c0 for _, _, c0, c1 in segments)
+        if longest > ALIGN_MAX_FRAMES:
+            print(
+                f"⚠️ Trecho de {longest * ALIGN_FRAME_SECONDS:.0f}s sem fim de frase para cortar "
+                f"(limite {ALIGN_MAX_FRAMES * ALIGN_FRAME_SECONDS:.0f}s por DTW)"
+            )
+            return {"text": " ".join(tokens), "segments": []}, 0.0
+
+    templates, paths_t, paths_a, frames = [], [], [], []
+    for i0, i1, c0, c1 in segments:
+        template, path_t, path_a, segment_frames = _align_segment(tokens[i0:i1], audio[c0:c1])
+        # os trechos são contíguos: molde e caminho concatenados cobrem o áudio todo
+        templates.append(template)
+        paths_t.append(path_t + c0)
+        paths_a.append(path_a + c0)
+        frames.extend((c0 + a0, c0 + a1) for a0, a1 in segment_frames)
+    confidence = pause_agreement(
+        np.concatenate(templates), audio, np.concatenate(paths_t), np.concatenate(paths_a)
+    )
+
+    words = [
+        {
+            "text": token,
+            "start": round((first + a0) * ALIGN_FRAME_SECONDS, 2),
+            "end": round((first + a1) * ALIGN_FRAME_SECONDS, 2),
+        }
+        for token, (a0, a1) in zip(tokens, frames)
+    ]
+    # tokens sem sílabas (símbolos soltos) herdam o fim do anterior
+    for i, token in enumerate(tokens):
+        if not syllable_count(token):
+            previous = words[i - 1]["end"] if i else words[i]["start"]
+            words[i]["start"] = words[i]["end"] = previous
+
+    return {"text": " ".join(tokens), "segments": [{"words": words}]}, confidence
+
+
+def captions_from_script(
+    script: str,
+    audio_filename: str,
+    model_size: str = default_model_size,
+    min_confidence: float = MIN_ALIGNMENT_CONFIDENCE,
+    **fallback_options
+):
+    """
+    Mesmas estruturas de karaoke_generator.generate_timed_captions, alinhando
+    o roteiro conhecido em vez de transcrever. Com confiança abaixo de
+    min_confidence, cai para a transcrição do Whisper.
+    """
+    started = time.monotonic()
+    analysis, confidence = align_script(script, audio_filename)
+    elapsed = time.monotonic() - started
+    if confidence < min_confidence:
+        print(
+            f"⚠️ Alinhamento forçado com confiança {confidence:.2f} "
+            f"(< {min_confidence:.2f}); transcrevendo com o Whisper"
+        )
+        return generate_timed_captions(audio_filename, model_size, **fallback_options)
+    print(f"Alinhamento forçado em {elapsed:.2f}s (confiança {confidence:.2f})")
+
+    captions = get_captions_with_time(
+        whisper_analysis=analysis,
+        max_caption_size=MAX_CAPTION_SIZE,
+        consider_punctuation=CONSIDER_PUNCTUATION
+    )
+    captions = normalize_captions(captions)
+
+    words = [
+        {"start": w["start"], "end": w["end"], "text": clean_word(w["text"])}
+        for segment in analysis["segments"]
+        for w in segment["words"]
+        if normalize_token(w["text"])
+    ]
+    return captions, words
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+import os
+import time
+import queue
+import atexit
+import threading
+import multiprocessing
+
+from whisper_timestamped import load_model, transcribe_timestamped
+
+# Dispositivo padrão do Whisper ('cpu', 'cuda'...); vazio = cuda se disponível
+default_device = os.getenv('WHISPER_DEVICE', '')
+# WHISPER_QUANTIZE=1 usa o modelo com Linear quantizado em int8 (só CPU)
+default_quantize = os.getenv('WHISPER_QUANTIZE', '0') == '1'
+# Threads do torch na CPU; 0 mantém o padrão do torch
+default_threads = int(os.getenv('WHISPER_THREADS', '0'))
+# Tempo máximo esperando o worker carregar o modelo (s)
+WORKER_LOAD_TIMEOUT = 900
+
+_registry = {}
+_registry_lock = threading.Lock()
+_workers = {}
+
+
+def resolve_device(device: str = None) -> str:
+    """Dispositivo efetivo: o informado, WHISPER_DEVICE ou cuda/cpu conforme o torch."""
+    device = device or default_device
+    if device:
+        return device
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def set_threads(threads: int) -> None:
+    """Fixa o número de threads do torch neste processo (0/None: mantém o atual)."""
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+
+def quantize_model(model):
+    """
+    Quantização dinâmica int8 das camadas lineares (pesos em int8, ativações
+    quantizadas em tempo de execução). O whisper usa a subclasse
+    whisper.model.Linear, que o quantize_dynamic não reconhece: elas viram
+    nn.Linear com os mesmos parâmetros antes da conversão.
+    """
+    import torch
+    from whisper.model import Linear as WhisperLinear
+
+    for module in list(model.modules()):
+        for name, child in list(module.named_children()):
+            if isinstance(child, WhisperLinear):
+                linear = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+                linear.weight = child.weight
+                linear.bias = child.bias
+                setattr(module, name, linear)
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _load(model_size: str, device: str, quantize: bool):
+    if quantize and device != "cpu":
+        print(f"⚠️ Quantização int8 só vale na CPU; usando '{model_size}' em fp32 ({device})")
+        quantize = False
+    model = load_model(model_size, device=device)
+    return quantize_model(model) if quantize else model
+
+
+def _entry(model_size: str, device: str, quantize: bool = False) -> dict:
+    """Entrada do registry para (tamanho, dispositivo, int8); o modelo é carregado uma vez."""
+    key = (model_size, device, quantize)
+    with _registry_lock:
+        entry = _registry.get(key)
+        if entry is None:
+            entry = {"model": None, "lock": threading.Lock(), "load_seconds": None, "uses": 0}
+            _registry[key] = entry
+    if entry["model"] is None:
+        with entry["lock"]:
+            if entry["model"] is None:
+                started = time.monotonic()
+                entry["model"] = _load(model_size, device, quantize)
+                entry["load_seconds"] = time.monotonic() - started
+                print(
+                    f"Modelo Whisper '{model_size}' ({device}{', int8' if quantize else ''}) "
+                    f"carregado em {entry['load_seconds']:.1f}s"
+                )
+    return entry
+
+
+def get_model(model_size: str, device: str = None, quantize: bool = None):
+    """Modelo Whisper compartilhado: carregado na primeira chamada, reaproveitado nas seguintes."""
+    quantize = default_quantize if quantize is None else quantize
+    return _entry(model_size, resolve_device(device), quantize)["model"]
+
+
+def transcribe(audio_filename: str, model_size: str, device: str = None, quantize: bool = None, **options) -> dict:
+    """
+    transcribe_timestamped com o modelo do registry. Chamadas concorrentes
+    ao mesmo modelo são serializadas (o whisper_timestamped instala hooks no
+    modelo durante a transcrição). Se houver um worker aquecido para
+    (model_size, device, quantize), a transcrição roda nele.
+    """
+    device = resolve_device(device)
+    quantize = default_quantize if quantize is None else quantize
+    worker = _workers.get((model_size, device, quantize))
+    if worker is not None:
+        return worker.transcribe(audio_filename, **options)
+
+    entry = _entry(model_size, device, quantize)
+    with entry["lock"]:
+        entry["uses"] += 1
+        return transcribe_timestamped(entry["model"], audio_filename, **options)
+
+
+def _worker_main(model_size: str, device: str, quantize: bool, jobs, results) -> None:
+    started = time.monotonic()
+    try:
+        set_threads(default_threads)
+        model = _load(model_size, device, quantize)
+    except Exception as e:
+        results.put(("error", repr(e)))
+        return
+    results.put(("ready", time.monotonic() - started))
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        audio_filename, options = job
+        try:
+            results.put(("ok", transcribe_timestamped(model, audio_filename, **options)))
+        except Exception as e:
+            results.put(("error", repr(e)))
+
+
+class WarmWorker:
+    """
+    Processo separado que carrega o modelo em segundo plano e o mantém na
+    memória, recebendo trabalhos de transcrição (um por vez).
+    """
+
+    def __init__(self, model_size: str, device: str, quantize: bool = False):
+        context = multiprocessing.get_context("spawn")
+        self.model_size = model_size
+        self.device = device
+        self.quantize = quantize
+        self.jobs = context.Queue()
+        self.results = context.Queue()
+        self.process = context.Process(
+            target=_worker_main, args=(model_size, device, quantize, self.jobs, self.results), daemon=True
+        )
+        self.process.start()
+        self._lock = threading.Lock()
+        self.load_seconds = None
+        self.uses = 0
+
+    def _receive(self, timeout: float = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                return self.results.get(timeout=1)
+            except queue.Empty:
+                if not self.process.is_alive():
+                    raise RuntimeError("worker do Whisper encerrou inesperadamente")
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError("worker do Whisper não respondeu a tempo")
+
+    def _wait_ready(self) -> None:
+        if self.load_seconds is None:
+            status, value = self._receive(timeout=WORKER_LOAD_TIMEOUT)
+            if status != "ready":
+                raise RuntimeError(f"worker do Whisper falhou ao carregar o modelo: {value}")
+            self.load_seconds = value
+
+    def transcribe(self, audio_filename: str, **options) -> dict:
+        with self._lock:
+            self._wait_ready()
+            # caminho relativo ao cwd deste processo; arrays (PCM) vão como estão
+            if isinstance(audio_filename, str):
+                audio_filename = os.path.abspath(audio_filename)
+            self.jobs.put((audio_filename, options))
+            status, value = self._receive()
+            self.uses += 1
+        if status != "ok":
+            raise RuntimeError(f"falha na transcrição: {value}")
+        return value
+
+    def close(self) -> None:
+        if self.process.is_alive():
+            self.jobs.put(None)
+            self.process.join(timeout=10)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+def start_warm_worker(model_size: str, device: str = None, quantize: bool = None) -> WarmWorker:
+    """
+    Inicia (se ainda não houver) o worker aquecido para (model_size, device, quantize).
+    Retorna imediatamente: o modelo carrega enquanto o resto do pipeline roda.
+    """
+    quantize = default_quantize if quantize is None else quantize
+    key = (model_size, resolve_device(device), quantize)
+    with _registry_lock:
+        worker = _workers.get(key)
+        if worker is None:
+            worker = WarmWorker(*key)
+            _workers[key] = worker
+    return worker
+
+
+def stop_warm_workers() -> None:
+    with _registry_lock:
+        workers = list(_workers.values())
+        _workers.clear()
+    for worker in workers:
+        worker.close()
+
+
+atexit.register(stop_warm_workers)
+
+
+def model_stats() -> dict:
+    """
+    {(tamanho, dispositivo, int8): {'load_seconds', 'uses', 'saved_seconds', 'worker'}}.
+    saved_seconds estima o tempo de carga poupado pelas reutilizações.
+    """
+    stats = {}
+    for key, entry in list(_registry.items()) + list(_workers.items()):
+        worker = isinstance(entry, WarmWorker)
+        load_seconds = entry.load_seconds if worker else entry["load_seconds"]
+        uses = entry.uses if worker else entry["uses"]
+        stats[key] = {
+            "load_seconds": load_seconds,
+            "uses": uses,
+            "saved_seconds": (load_seconds or 0.0) * max(uses - 1, 0),
+            "worker": worker,
+        }
+    return stats
+
+
+def format_model_stats(stats: dict = None) -> str:
+    """Resumo legível de model_stats."""
+    stats = model_stats() if stats is None else stats
+    parts = []
+    for (model_size, device, quantize), s in stats.items():
+        load = "carregando" if s["load_seconds"] is None else f"carga {s['load_seconds']:.1f}s"
+        where = "worker" if s["worker"] else "processo"
+        parts.append(
+            f"{model_size}/{device}{'/int8' if quantize else ''} ({where}): {load}, {s['uses']} usos, "
+            f"~{s['saved_seconds']:.1f}s poupados"
+        )
+    return "; ".join(parts) or "nenhum modelo carregado"
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utility.captions.model_registry import get_model, set_threads, transcribe
+from utility.audio.narration import load_narration
+from utility.captions.word_matching import normalize_token
+
+# Taxa usada pelo Whisper
+SAMPLE_RATE = 16000
+# Duração alvo de cada trecho (s); o corte real cai no silêncio mais próximo
+CHUNK_SECONDS = float(os.getenv('TRANSCRIBE_CHUNK_SECONDS', '30'))
+# Áudio extra de cada lado do trecho, para não cortar palavras na borda (s)
+CHUNK_OVERLAP = 0.5
+# Janela em torno do corte ideal onde se procura o silêncio (s)
+SILENCE_SEARCH = 5.0
+# Resolução da análise de energia e suavização usada para achar pausas (s)
+FRAME_SECONDS = 0.02
+SMOOTH_SECONDS = 0.2
+# Processos de transcrição (cada um com o seu modelo carregado)
+TRANSCRIBE_WORKERS = int(os.getenv('TRANSCRIBE_WORKERS', '0')) or max(1, (os.cpu_count() or 1) // 2)
+
+
+def frame_energy(samples: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                 frame_seconds: float = FRAME_SECONDS) -> np.ndarray:
+    """RMS por quadro de frame_seconds."""
+    hop = max(1, int(sample_rate * frame_seconds))
+    n = len(samples) // hop
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:n * hop].reshape(n, hop)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+
+def plan_cuts(samples: np.ndarray, sample_rate: int = SAMPLE_RATE,
+              chunk_seconds: float = CHUNK_SECONDS, search: float = SILENCE_SEARCH) -> list:
+    """
+    Instantes de corte (s): a cada chunk_seconds, o ponto de menor energia
+    (suavizada) dentro de ±search do corte ideal.
+    """
+    duration = len(samples) / sample_rate
+    energy = frame_energy(samples, sample_rate)
+    width = max(1, int(SMOOTH_SECONDS / FRAME_SECONDS))
+    if len(energy) >= width:
+        energy = np.convolve(energy, np.ones(width) / width, mode="same")
+
+    cuts = []
+    previous = 0.0
+    target = chunk_seconds
+    while target + chunk_seconds / 2 < duration:
+        lo = max(previous + chunk_seconds / 2, target - search)
+        hi = min(duration, target + search)
+        i0, i1 = int(lo / FRAME_SECONDS), min(int(hi / FRAME_SECONDS), len(energy))
+        if i1 > i0:
+            cut = (i0 + int(np.argmin(energy[i0:i1])) + 0.5) * FRAME_SECONDS
+        else:
+            cut = target
+        cuts.append(cut)
+        previous = cut
+        target = cut + chunk_seconds
+    return cuts
+
+
+def plan_chunks(samples: np.ndarray, sample_rate: int = SAMPLE_RATE,
+                chunk_seconds: float = CHUNK_SECONDS, overlap: float = CHUNK_OVERLAP) -> list:
+    """
+    [{'core': (a, b), 'start', 'end'}, ...]: core é o trecho pelo qual o
+    chunk responde; start/end incluem a sobreposição com os vizinhos.
+    """
+    duration = len(samples) / sample_rate
+    edges = [0.0] + plan_cuts(samples, sample_rate, chunk_seconds) + [duration]
+    return [
+        {"core": (a, b), "start": max(0.0, a - overlap), "end": min(duration, b + overlap)}
+        for a, b in zip(edges, edges[1:])
+    ]
+
+
+def transcribe_chunk(job: tuple) -> dict:
+    """Executado no pool: transcreve um trecho com o modelo do processo (model_registry)."""
+    samples, model_size, options = job
+    return transcribe(samples, model_size, **options)
+
+
+def stitch_chunks(chunks: list, results: list) -> dict:
+    """
+    Junta os resultados num único resultado no formato do transcribe_timestamped:
+    tempos voltam para a linha do tempo original e, na sobreposição, cada
+    palavra fica com o trecho que contém o seu ponto médio.
+    """
+    segments = []
+    texts = []
+    for chunk, result in zip(chunks, results):
+        a, b = chunk["core"]
+        words = []
+        for segment in result.get("segments", []):
+            for word in segment.get("words", []):
+                start = word["start"] + chunk["start"]
+                end = word["end"] + chunk["start"]
+                if a <= (start + end) / 2 < b:
+                    words.append(dict(word, start=round(start, 2), end=round(end, 2)))
+        if not words:
+            continue
+        text = " ".join(word["text"] for word in words)
+        segments.append({
+            "id": len(segments),
+            "start": words[0]["start"],
+            "end": words[-1]["end"],
+            "text": " " + text,
+            "words": words,
+        })
+        texts.append(text)
+
+    language = next((r.get("language") for r in results if r.get("language")), None)
+    return {"text": " ".join(texts), "segments": segments, "language": language}
+
+
+def transcribe_parallel(
+    audio_filename: str,
+    model_size: str,
+    max_workers: int = TRANSCRIBE_WORKERS,
+    chunk_seconds: float = CHUNK_SECONDS,
+    **options
+) -> tuple:
+    """
+    Corta o áudio nos silêncios, transcreve os trechos em processos paralelos
+    e costura o resultado. Retorna (resultado, relatório).
+    O tempo inclui a carga do modelo em cada processo.
+    """
+    started = time.monotonic()
+    samples = load_narration(audio_filename).pcm(SAMPLE_RATE)
+    chunks = plan_chunks(samples, SAMPLE_RATE, chunk_seconds)
+    jobs = [
+        (samples[int(c["start"] * SAMPLE_RATE):int(c["end"] * SAMPLE_RATE)], model_size, options)
+        for c in chunks
+    ]
+    max_workers = max(1, min(max_workers, len(jobs)))
+    threads = max(1, (os.cpu_count() or 1) // max_workers)
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=set_threads,
+        initargs=(threads,)
+    ) as pool:
+        results = list(pool.map(transcribe_chunk, jobs))
+
+    report = {
+        "chunks": len(chunks),
+        "workers": max_workers,
+        "audio_seconds": len(samples) / SAMPLE_RATE,
+        "seconds": time.monotonic() - started,
+    }
+    return stitch_chunks(chunks, results), report
+
+
+def transcribe_chunked(audio_filename: str, model_size: str, **options) -> dict:
+    """transcribe_parallel com a mesma assinatura de model_registry.transcribe."""
+    result, report = transcribe_parallel(audio_filename, model_size, **options)
+    print(
+        f"Transcrição em {report['chunks']} trechos / {report['workers']} processos: "
+        f"{report['audio_seconds']:.0f}s de áudio em {report['seconds']:.1f}s"
+    )
+    return result
+
+
+def result_words(result: dict) -> list:
+    return [w["text"] for s in result.get("segments", []) for w in s.get("words", [])]
+
+
+def word_error_rate(reference: list, hypothesis: list) -> float:
+    """WER (substituições + inserções + remoções) / palavras da referência."""
+    ref = [normalize_token(w) for w in reference]
+    hyp = [normalize_token(w) for w in hypothesis]
+    if not ref:
+        return float(len(hyp) > 0)
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def compare_with_single_pass(audio_filename: str, model_size: str,
+                             max_workers: int = TRANSCRIBE_WORKERS, **options) -> dict:
+    """
+    Roda a transcrição única (modelo já carregado, fora da medida) e a
+    paralela; retorna o relatório com speedup e WER da paralela em relação à única.
+    """
+    get_model(model_size, quantize=options.get("quantize"))
+    started = time.monotonic()
+    single = transcribe(load_narration(audio_filename).pcm(SAMPLE_RATE), model_size, **options)
+    single_seconds = time.monotonic() - started
+
+    chunked, report = transcribe_parallel(audio_filename, model_size, max_workers=max_workers, **options)
+    report.update(
+        single_seconds=single_seconds,
+        speedup=single_seconds / report["seconds"] if report["seconds"] else 0.0,
+        wer_delta=word_error_rate(result_words(single), result_words(chunked)),
+    )
+    return report
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) < 2:
+        print('Uso: python -m utility.captions.parallel_transcription audio.wav [modelo]')
+        sys.exit(1)
+
+    model = sys.argv[2] if len(sys.argv) > 2 else os.getenv('WHISPER_MODEL_SIZE', 'small')
+    r = compare_with_single_pass(sys.argv[1], model, verbose=False, fp16=False, language='pt')
+    print(
+        f"{r['chunks']} trechos em {r['workers']} processos: {r['seconds']:.1f}s "
+        f"(passe único {r['single_seconds']:.1f}s, speedup {r['speedup']:.2f}x), "
+        f"WER em relação ao passe único: {100 * r['wer_delta']:.2f}%"
+    )
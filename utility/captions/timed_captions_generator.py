@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
 import os
-import re
-from whisper_timestamped import load_model, transcribe_timestamped
+from utility.captions.caption_alignment import get_captions_with_time
+from utility.captions.model_registry import default_quantize, default_threads, set_threads
+from utility.captions.transcription_cache import cached_transcribe
 
 # Parâmetros de configuração
 default_model_size = os.getenv('WHISPER_MODEL_SIZE', 'small')
 default_language = 'pt'
+# CHUNKED_TRANSCRIPTION=1 transcreve em trechos paralelos cortados nos silêncios
+default_chunked = os.getenv('CHUNKED_TRANSCRIPTION', '0') == '1'
 MAX_CAPTION_SIZE = 40          # máximo de caracteres por legenda
 CONSIDER_PUNCTUATION = True    # quebrar por pontuação
 MIN_CAPTION_DURATION = 4       # duração mínima de cada legenda (s)
@@ -15,17 +18,23 @@ MAX_CAPTION_DURATION = 6       # duração máxima de cada legenda (s)
 def generate_timed_captions(
     audio_filename: str,
     model_size: str = default_model_size,
-    language: str = default_language
+    language: str = default_language,
+    chunked: bool = default_chunked,
+    quantize: bool = default_quantize,
+    threads: int = default_threads
 ):
     """
     Transcreve o áudio e gera legendas temporizadas em Português.
     Retorna lista de tuplas [((start, end), texto), ...].
     """
-    whisper_model = load_model(model_size)
-    # Inclui parâmetro de idioma se suportado
-    gen = transcribe_timestamped(
-        whisper_model,
+    # quantize: Linear em int8 na CPU; threads: threads do torch neste processo
+    set_threads(threads)
+    # modelo carregado uma vez por processo; resultado reaproveitado do cache em disco
+    gen = cached_transcribe(
         audio_filename,
+        model_size,
+        chunked=chunked,
+        quantize=quantize,
         verbose=False,
         fp16=False,
         language=language
@@ -39,78 +48,6 @@ def generate_timed_captions(
     return normalize_captions(captions)
 
 
-def split_words_by_size(words, max_caption_size: int):
-    half_size = max_caption_size / 2
-    captions = []
-    while words:
-        caption = words.pop(0)
-        while words and len(caption + ' ' + words[0]) <= max_caption_size:
-            caption += ' ' + words.pop(0)
-            if len(caption) >= half_size and words:
-                break
-        captions.append(caption)
-    return captions
-
-
-def get_timestamp_mapping(whisper_analysis: dict):
-    index = 0
-    mapping = {}
-    for segment in whisper_analysis.get('segments', []):
-        for word in segment.get('words', []):
-            start_idx = index
-            end_idx = start_idx + len(word['text']) + 1
-            mapping[(start_idx, end_idx)] = word.get('end')
-            index = end_idx
-    return mapping
-
-
-def clean_word(word: str) -> str:
-    # preserva caracteres de palavras em PT (acentos) e hífens
-    return re.sub(r"[^\wÀ-ÿ\s\-_'\"]", "", word)
-
-
-
-def interpolate_time(position: int, mapping: dict):
-    for (start, end), ts in mapping.items():
-        if start <= position <= end:
-            return ts
-    return None
-
-
-def get_captions_with_time(
-    whisper_analysis: dict,
-    max_caption_size: int,
-    consider_punctuation: bool
-):
-    word_map = get_timestamp_mapping(whisper_analysis)
-    position = 0
-    start_time = 0
-    captions = []
-    text = whisper_analysis.get('text', '')
-
-    # Quebra em palavras agrupadas
-    if consider_punctuation:
-        sentences = re.split(r'(?<=[.!?]) +', text)
-        chunks = []
-        for sentence in sentences:
-            words = sentence.split()
-            cleaned = [clean_word(w) for w in words]
-            chunks.extend(split_words_by_size(cleaned, max_caption_size))
-    else:
-        words = text.split()
-        cleaned = [clean_word(w) for w in words]
-        chunks = split_words_by_size(cleaned, max_caption_size)
-
-    # Atribui timestamps a cada chunk
-    for chunk in chunks:
-        position += len(chunk) + 1
-        end_time = interpolate_time(position, word_map)
-        if end_time is not None and chunk:
-            captions.append(((start_time, end_time), chunk))
-            start_time = end_time
-    return captions
-
-
 def normalize_captions(captions):
     """
     Ajusta legendas para que cada segmento tenha entre MIN_CAPTION_DURATION e MAX_CAPTION_DURATION.
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+import os
+import gzip
+import json
+import hashlib
+
+from utility.audio.narration import load_narration
+from utility.captions.model_registry import transcribe
+
+# Resultados brutos do transcribe_timestamped já calculados (gzip JSON)
+TRANSCRIPTION_CACHE_DIR = os.getenv('TRANSCRIPTION_CACHE_DIR', '.cache/transcriptions')
+# Orçamento de disco; entradas menos usadas saem primeiro
+TRANSCRIPTION_CACHE_MAX_BYTES = int(os.getenv('TRANSCRIPTION_CACHE_MAX_BYTES', str(200 * 1024 ** 2)))
+# TRANSCRIPTION_CACHE=0 desliga o cache
+TRANSCRIPTION_CACHE_ENABLED = os.getenv('TRANSCRIPTION_CACHE', '1') == '1'
+# Opções que não mudam o resultado e ficam fora da chave
+IGNORED_OPTIONS = {'verbose'}
+# Taxa de entrada do Whisper
+WHISPER_SAMPLE_RATE = 16000
+
+_stats = {"hits": 0, "misses": 0}
+
+
+def audio_digest(audio_filename: str, chunk_size: int = 1 << 20) -> str:
+    """sha256 do conteúdo do áudio (o nome do arquivo não importa)."""
+    digest = hashlib.sha256()
+    with open(audio_filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def transcription_key(audio_filename: str, model_size: str, options: dict) -> str:
+    """Chave: hash do áudio + tamanho do modelo + idioma e demais opções de decodificação."""
+    identity = {
+        "audio": audio_digest(audio_filename),
+        "model": model_size,
+        "options": {k: v for k, v in options.items() if k not in IGNORED_OPTIONS},
+    }
+    return hashlib.sha1(json.dumps(identity, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def _entry_path(key: str) -> str:
+    return os.path.join(TRANSCRIPTION_CACHE_DIR, f"{key}.json.gz")
+
+
+def _to_json(value):
+    # escalares numpy/torch eventualmente presentes no resultado
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+def lookup(key: str) -> dict:
+    """Resultado guardado para a chave, ou None."""
+    path = _entry_path(key)
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            result = json.load(f)
+        # o mtime marca o último uso (LRU)
+        os.utime(path)
+    except (OSError, ValueError):
+        return None
+    return result
+
+
+def store(key: str, result: dict) -> str:
+    """Grava o resultado de forma atômica e aplica o orçamento de disco."""
+    os.makedirs(TRANSCRIPTION_CACHE_DIR, exist_ok=True)
+    path = _entry_path(key)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, separators=(',', ':'), default=_to_json)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    evict()
+    return path
+
+
+def evict(max_bytes: int = TRANSCRIPTION_CACHE_MAX_BYTES) -> int:
+    """Remove as entradas usadas há mais tempo até caber em max_bytes. Retorna os bytes liberados."""
+    if not os.path.isdir(TRANSCRIPTION_CACHE_DIR):
+        return 0
+    entries = []
+    for name in os.listdir(TRANSCRIPTION_CACHE_DIR):
+        if not name.endswith('.json.gz'):
+            continue
+        path = os.path.join(TRANSCRIPTION_CACHE_DIR, name)
+        try:
+            entries.append((os.path.getmtime(path), os.path.getsize(path), path))
+        except OSError:
+            continue
+
+    total = sum(size for _, size, _ in entries)
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        freed += size
+    return freed
+
+
+def transcribe_narration(audio_filename: str, model_size: str, **options) -> dict:
+    """model_registry.transcribe sobre o buffer compartilhado da narração (sem novo decode pelo Whisper)."""
+    return transcribe(load_narration(audio_filename).pcm(WHISPER_SAMPLE_RATE), model_size, **options)
+
+
+def cached_transcribe(
+    audio_filename: str,
+    model_size: str,
+    chunked: bool = False,
+    quantize: bool = False,
+    **options
+) -> dict:
+    """
+    transcribe_timestamped com cache em disco: o mesmo áudio, modelo e opções
+    reaproveitam o resultado anterior sem rodar o Whisper.
+    chunked=True transcreve em trechos paralelos (parallel_transcription) e
+    quantize=True usa o modelo int8; ambos têm entrada própria no cache.
+    """
+    run = transcribe_narration
+    if chunked:
+        from utility.captions.parallel_transcription import transcribe_chunked as run
+    key_options = dict(options)
+    if chunked:
+        key_options["chunked"] = True
+    if quantize:
+        key_options["quantize"] = True
+    options["quantize"] = quantize
+    if not TRANSCRIPTION_CACHE_ENABLED:
+        return run(audio_filename, model_size, **options)
+
+    key = transcription_key(audio_filename, model_size, key_options)
+    result = lookup(key)
+    if result is not None:
+        _stats["hits"] += 1
+        print(f"Transcrição reaproveitada do cache ({key[:10]})")
+        return result
+
+    _stats["misses"] += 1
+    result = run(audio_filename, model_size, **options)
+    store(key, result)
+    return result
+
+
+def cache_stats() -> dict:
+    """Acertos e faltas do cache neste processo."""
+    return dict(_stats)
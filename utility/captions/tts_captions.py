@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+from utility.captions.caption_alignment import clean_word, get_captions_with_time
+from utility.captions.karaoke_generator import (
+    CONSIDER_PUNCTUATION,
+    MAX_CAPTION_SIZE,
+    normalize_captions
+)
+from utility.captions.word_matching import normalize_token
+
+# Quantos tokens à frente procurar uma palavra do TTS no roteiro
+MATCH_LOOKAHEAD = 8
+
+
+def match_boundaries(tokens: list, boundaries: list) -> list:
+    """
+    Associa cada WordBoundary ao índice do token do roteiro que ela narra
+    (None se não achar). Prefere a igualdade exata dentro da janela; senão
+    aceita a palavra contida no token (ex.: partes de palavras hifenizadas).
+    """
+    normalized = [normalize_token(tok) for tok in tokens]
+    matches = []
+    cursor = 0
+    for boundary in boundaries:
+        target = normalize_token(boundary["text"])
+        window = range(cursor, min(cursor + MATCH_LOOKAHEAD, len(normalized)))
+        idx = next((j for j in window if normalized[j] == target), None)
+        if idx is not None:
+            cursor = idx + 1
+        elif target:
+            idx = next((j for j in window if target in normalized[j]), None)
+            if idx is not None:
+                cursor = idx
+        matches.append(idx)
+    return matches
+
+
+def boundaries_to_analysis(text: str, boundaries: list) -> dict:
+    """
+    Monta um resultado no formato do transcribe_timestamped a partir do
+    roteiro e das WordBoundary: cada token do roteiro vira uma palavra com o
+    início da primeira e o fim da última boundary associada. Tokens sem
+    boundary (pontuação solta, símbolos) herdam o fim do token anterior.
+    """
+    tokens = text.split()
+    spans = [None] * len(tokens)
+    for boundary, idx in zip(boundaries, match_boundaries(tokens, boundaries)):
+        if idx is None:
+            continue
+        if spans[idx] is None:
+            spans[idx] = [boundary["start"], boundary["end"]]
+        else:
+            spans[idx][1] = max(spans[idx][1], boundary["end"])
+
+    words = []
+    last_end = 0.0
+    for token, span in zip(tokens, spans):
+        start, end = span if span else (last_end, last_end)
+        words.append({"text": token, "start": start, "end": end})
+        last_end = end
+    return {"text": " ".join(tokens), "segments": [{"words": words}]}
+
+
+def captions_from_boundaries(text: str, boundaries: list):
+    """
+    Mesmas estruturas de karaoke_generator.generate_timed_captions, sem Whisper:
+    - legendas por frase: [((start, end), texto), ...]
+    - palavras com timestamps: [{'start', 'end', 'text'}, ...]
+    """
+    analysis = boundaries_to_analysis(text, boundaries)
+    captions = get_captions_with_time(
+        whisper_analysis=analysis,
+        max_caption_size=MAX_CAPTION_SIZE,
+        consider_punctuation=CONSIDER_PUNCTUATION
+    )
+    captions = normalize_captions(captions)
+
+    words = [
+        {"start": b["start"], "end": b["end"], "text": clean_word(b["text"])}
+        for b in boundaries
+    ]
+    return captions, words
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+import re
+
+
+def normalize_token(token: str) -> str:
+    """Minúsculas, sem pontuação: forma usada para comparar palavras e tokens."""
+    return re.sub(r"[^\w]", "", token.lower())
+
+
+def match_phrase_words(tokens: list, phrase_words: list) -> list:
+    """
+    Associa cada palavra temporizada da frase ao índice do token correspondente
+    no texto da frase. Palavras sem correspondência ficam com None.
+    """
+    normalized = [normalize_token(tok) for tok in tokens]
+    matches = []
+    cursor = 0
+    for word in phrase_words:
+        target = normalize_token(word["text"])
+        idx = None
+        for j in range(cursor, len(normalized)):
+            if normalized[j] == target:
+                idx = j
+                break
+        if idx is not None:
+            cursor = idx + 1
+        matches.append(idx)
+    return matches
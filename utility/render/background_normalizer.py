@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+from utility.render.ffmpeg_utils import run_ffmpeg
+from utility.render.geometry import ffmpeg_fit_filter
+from utility.video.media_cache import fetch, fetch_all
+
+# Diretório dos intermediários já normalizados (reaproveitados entre execuções)
+NORMALIZED_CACHE_DIR = os.getenv('NORMALIZED_CACHE_DIR', '.cache/normalized')
+# Processos usados na pré-normalização
+NORMALIZE_WORKERS = int(os.getenv('NORMALIZE_WORKERS', '0')) or os.cpu_count() or 1
+# Qualidade dos intermediários (x264 CRF; baixo = quase sem perdas)
+INTERMEDIATE_CRF = 18
+
+
+def normalized_path(video_url: str, duration: float, width: int, height: int, fps: int) -> str:
+    """Caminho do intermediário no cache, derivado da URL e do formato alvo."""
+    key = f"{video_url}|{duration:.3f}|{width}x{height}|{fps}"
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    return os.path.join(NORMALIZED_CACHE_DIR, f"{digest}.mp4")
+
+
+def normalize_segment(job: tuple) -> str:
+    """
+    Obtém o vídeo pelo cache de mídia e transcodifica um fundo para o formato alvo, já com a
+    duração do segmento (em loop quando o vídeo é curto) e sem áudio.
+    Executado nos processos do pool; retorna o caminho ou None se falhar.
+    """
+    video_url, duration, width, height, fps = job
+    out_path = normalized_path(video_url, duration, width, height, fps)
+    if os.path.exists(out_path):
+        return out_path
+
+    os.makedirs(NORMALIZED_CACHE_DIR, exist_ok=True)
+    tmp_out = f"{out_path}.{os.getpid()}.tmp.mp4"
+    try:
+        src = fetch(video_url)["path"]
+        run_ffmpeg([
+            "-stream_loop", "-1", "-i", src,
+            "-t", f"{duration:.3f}",
+            "-vf", f"fps={fps},{ffmpeg_fit_filter(width, height)},setsar=1",
+            "-an",
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", str(INTERMEDIATE_CRF),
+            "-pix_fmt", "yuv420p",
+            tmp_out
+        ])
+        os.replace(tmp_out, out_path)
+        return out_path
+    except Exception as e:
+        print(f"⚠️ Falha ao normalizar vídeo '{video_url}': {e}")
+        return None
+    finally:
+        if os.path.exists(tmp_out):
+            os.remove(tmp_out)
+
+
+def normalize_backgrounds(
+    background_video_data: list,
+    width: int = 1920,
+    height: int = 1080,
+    fps: int = 25,
+    max_workers: int = NORMALIZE_WORKERS
+) -> list:
+    """
+    Pré-processa todos os fundos em paralelo (um processo por núcleo).
+    Segmentos sem URL reaproveitam o último vídeo que baixou e normalizou com
+    sucesso, como o last_entry do render; os que têm URL e falham ficam pretos.
+    Retorna [[t1, t2], caminho_local_ou_None] na mesma ordem da entrada.
+    """
+    # baixa antes (pelo cache): os processos só consultam o cache
+    entries, _ = fetch_all([video_url for _, video_url in background_video_data])
+    jobs = [
+        (video_url, float(t2) - float(t1), width, height, fps) if video_url and entries[video_url] else None
+        for (t1, t2), video_url in background_video_data
+    ]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending = list(dict.fromkeys(job for job in jobs if job is not None))
+        done = dict(zip(pending, pool.map(normalize_segment, pending)))
+
+        # fallbacks: só agora se sabe qual foi o último fundo que deu certo
+        last_url = None
+        for i, ((t1, t2), video_url) in enumerate(background_video_data):
+            if video_url:
+                if done.get(jobs[i]):
+                    last_url = video_url
+            elif last_url:
+                jobs[i] = (last_url, float(t2) - float(t1), width, height, fps)
+        pending = list(dict.fromkeys(job for job in jobs if job is not None and job not in done))
+        done.update(zip(pending, pool.map(normalize_segment, pending)))
+
+    return [
+        [[t1, t2], done.get(job) if job else None]
+        for ((t1, t2), _), job in zip(background_video_data, jobs)
+    ]
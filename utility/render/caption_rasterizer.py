@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+from moviepy.editor import ImageClip
+
+# Fonte padrão das legendas (caminho .ttf ou nome que o Pillow consiga resolver)
+default_font = os.getenv('CAPTION_FONT', 'DejaVuSans-Bold.ttf')
+# Máximo de bitmaps mantidos no cache em memória
+CACHE_MAX_ENTRIES = int(os.getenv('CAPTION_CACHE_ENTRIES', '512'))
+# Diretório do cache em disco (vazio = desativado)
+CACHE_DIR = os.getenv('CAPTION_CACHE_DIR', '')
+# Orçamento do cache em disco; PNGs usados há mais tempo saem primeiro
+CACHE_MAX_BYTES = int(os.getenv('CAPTION_CACHE_MAX_BYTES', str(200 * 1024 ** 2)))
+# Espaço extra entre linhas (fração do tamanho da fonte)
+LINE_SPACING = 0.2
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evicted_bytes": 0}
+
+
+@lru_cache(maxsize=32)
+def load_font(font: str, fontsize: int):
+    """Carrega a fonte TrueType; cai na fonte embutida do Pillow se não existir."""
+    try:
+        return ImageFont.truetype(font, fontsize)
+    except OSError:
+        print(f"⚠️ Fonte '{font}' não encontrada, usando fonte padrão do Pillow.")
+        return ImageFont.load_default(size=fontsize)
+
+
+def wrap_words(words: list, font, max_width: float) -> list:
+    """
+    Quebra a lista de palavras em linhas que caibam em max_width (como method="caption").
+    Retorna lista de linhas, cada uma com os índices das palavras que contém.
+    """
+    lines = []
+    current = []
+    for idx, word in enumerate(words):
+        candidate = ' '.join(words[i] for i in current + [idx])
+        if current and font.getlength(candidate) > max_width:
+            lines.append(current)
+            current = [idx]
+        else:
+            current.append(idx)
+    if current:
+        lines.append(current)
+    return lines
+
+
+def layout_caption(
+    text: str,
+    font: str = default_font,
+    fontsize: int = 48,
+    stroke_width: int = 2,
+    width: int = None,
+    align: str = "center"
+) -> dict:
+    """
+    Calcula a diagramação da legenda sem rasterizar.
+    Retorna {'size': (w, h), 'lines': [(texto, x, y), ...],
+             'boxes': [(x0, y0, x1, y1) para cada palavra de text.split()]}.
+    """
+    pil_font = load_font(font, fontsize)
+    words = text.split()
+    ascent, descent = pil_font.getmetrics()
+    line_height = ascent + descent + int(fontsize * LINE_SPACING)
+    max_width = (width - 2 * stroke_width) if width else float('inf')
+    lines = wrap_words(words, pil_font, max_width) if words else [[]]
+
+    widths = [pil_font.getlength(' '.join(words[i] for i in line)) for line in lines]
+    img_w = width or int(np.ceil(max(widths))) + 2 * stroke_width
+    img_h = len(lines) * line_height + 2 * stroke_width
+
+    out_lines = []
+    boxes = []
+    space = pil_font.getlength(' ')
+    for row, (line, line_w) in enumerate(zip(lines, widths)):
+        if align == "center":
+            x = (img_w - line_w) / 2
+        elif align == "right":
+            x = img_w - stroke_width - line_w
+        else:
+            x = stroke_width
+        y = stroke_width + row * line_height
+        out_lines.append((' '.join(words[i] for i in line), x, y))
+        cursor = x
+        for i in line:
+            word_w = pil_font.getlength(words[i])
+            boxes.append((
+                max(0, int(cursor) - stroke_width),
+                max(0, y - stroke_width),
+                min(img_w, int(np.ceil(cursor + word_w)) + stroke_width),
+                min(img_h, y + line_height + stroke_width)
+            ))
+            cursor += word_w + space
+    return {"size": (img_w, img_h), "lines": out_lines, "boxes": boxes}
+
+
+def _disk_path(key: tuple) -> str:
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+    return os.path.join(CACHE_DIR, f"{digest}.png")
+
+
+def _rasterize(text, font, fontsize, color, stroke_width, stroke_color, width, align) -> np.ndarray:
+    layout = layout_caption(text, font, fontsize, stroke_width, width, align)
+    pil_font = load_font(font, fontsize)
+    img = Image.new("RGBA", layout["size"], (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    for line, x, y in layout["lines"]:
+        draw.text(
+            (x, y), line, font=pil_font, fill=color,
+            stroke_width=stroke_width, stroke_fill=stroke_color
+        )
+    return np.array(img)
+
+
+def render_caption(
+    text: str,
+    font: str = default_font,
+    fontsize: int = 48,
+    color: str = "white",
+    stroke_width: int = 2,
+    stroke_color: str = "black",
+    width: int = None,
+    align: str = "center"
+) -> np.ndarray:
+    """
+    Rasteriza a legenda em memória (RGBA uint8), sem chamar o ImageMagick.
+    Resultados ficam num cache LRU (e opcionalmente em CACHE_DIR), então
+    palavras e frases repetidas são desenhadas uma única vez.
+    """
+    key = (text, font, fontsize, color, stroke_width, stroke_color, width, align)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            _cache_stats["hits"] += 1
+            return _cache[key]
+
+    rgba = None
+    if CACHE_DIR and os.path.exists(_disk_path(key)):
+        try:
+            with Image.open(_disk_path(key)) as img:
+                rgba = np.array(img.convert("RGBA"))
+            # o mtime marca o último uso (LRU do evict)
+            os.utime(_disk_path(key))
+            stat = "disk_hits"
+        except OSError:
+            rgba = None
+
+    if rgba is None:
+        rgba = _rasterize(text, font, fontsize, color, stroke_width, stroke_color, width, align)
+        stat = "misses"
+        if CACHE_DIR:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp_path = _disk_path(key) + f".{os.getpid()}.{threading.get_ident()}.tmp"
+            Image.fromarray(rgba, "RGBA").save(tmp_path, format="PNG")
+            os.replace(tmp_path, _disk_path(key))
+            evict()
+
+    # bitmap compartilhado entre clipes: protege contra escrita acidental
+    rgba.flags.writeable = False
+    with _cache_lock:
+        _cache_stats[stat] += 1
+        _cache[key] = rgba
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return rgba
+
+
+def evict(max_bytes: int = None) -> int:
+    """
+    Remove os PNGs de CACHE_DIR usados há mais tempo até caber em max_bytes
+    (padrão CACHE_MAX_BYTES). Retorna os bytes liberados.
+    """
+    if max_bytes is None:
+        max_bytes = CACHE_MAX_BYTES
+    if not CACHE_DIR or not os.path.isdir(CACHE_DIR):
+        return 0
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith('.png'):
+            continue
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            entries.append((os.path.getmtime(path), os.path.getsize(path), path))
+        except OSError:
+            continue
+
+    total = sum(size for _, size, _ in entries)
+    freed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        freed += size
+    with _cache_lock:
+        _cache_stats["evicted_bytes"] += freed
+    return freed
+
+
+def cache_info() -> dict:
+    """Retorna contadores do cache de bitmaps (hits, disk_hits, misses, evicted_bytes, entries)."""
+    with _cache_lock:
+        return dict(_cache_stats, entries=len(_cache))
+
+
+def caption_clip(
+    text: str,
+    fontsize: int = 48,
+    color: str = "white",
+    stroke_width: int = 2,
+    stroke_color: str = "black",
+    width: int = None,
+    align: str = "center",
+    font: str = default_font
+) -> ImageClip:
+    """
+    Substituto de TextClip(method="caption") baseado no Pillow.
+    Retorna um ImageClip com máscara a partir do alfa do bitmap.
+    """
+    rgba = render_caption(text, font, fontsize, color, stroke_width, stroke_color, width, align)
+    clip = ImageClip(rgba[:, :, :3])
+    mask = ImageClip(rgba[:, :, 3] / 255.0, ismask=True)
+    return clip.set_mask(mask)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+from bisect import bisect_right
+
+from moviepy.editor import CompositeVideoClip
+
+
+def build_interval_index(clips: list):
+    """
+    Indexa a linha do tempo das camadas uma única vez.
+    Retorna (boundaries, active): boundaries é a lista ordenada de instantes em
+    que alguma camada entra ou sai; active[i] contém os índices das camadas
+    visíveis em [boundaries[i], boundaries[i+1]), na ordem original de empilhamento.
+    """
+    events = []
+    for idx, clip in enumerate(clips):
+        start = clip.start
+        end = float('inf') if clip.end is None else clip.end
+        if end <= start:
+            continue
+        events.append((start, 1, idx))
+        events.append((end, 0, idx))
+    # saídas (0) antes de entradas (1) no mesmo instante: intervalos são [start, end)
+    events.sort()
+
+    boundaries = []
+    active = []
+    playing = set()
+    i = 0
+    while i < len(events):
+        t = events[i][0]
+        while i < len(events) and events[i][0] == t:
+            _, kind, idx = events[i]
+            if kind:
+                playing.add(idx)
+            else:
+                playing.discard(idx)
+            i += 1
+        boundaries.append(t)
+        active.append(sorted(playing))
+    return boundaries, active
+
+
+class IndexedCompositeVideoClip(CompositeVideoClip):
+    """
+    CompositeVideoClip que consulta um índice de intervalos em vez de testar
+    todas as camadas a cada frame: cada frame custa O(log n + camadas ativas).
+    Camadas com release() (ver reader_pool) são liberadas ao sair de cena.
+    """
+
+    def __init__(self, clips, size=None, bg_color=None, use_bgclip=False, ismask=False):
+        CompositeVideoClip.__init__(self, clips, size=size, bg_color=bg_color,
+                                    use_bgclip=use_bgclip, ismask=ismask)
+        self.boundaries, self.active = build_interval_index(self.clips)
+        self.current_interval = None
+        # a máscara composta também passa a usar o índice
+        if self.mask is not None and not ismask:
+            self.mask = IndexedCompositeVideoClip(self.mask.clips, self.size,
+                                                  ismask=True, bg_color=0.0)
+
+    def playing_clips(self, t=0):
+        i = bisect_right(self.boundaries, t) - 1
+        if i != self.current_interval:
+            self._release_left(self.current_interval, i)
+            self.current_interval = i
+        if i < 0:
+            return []
+        return [self.clips[idx] for idx in self.active[i]]
+
+    def _release_left(self, previous, current):
+        """Chama release() das camadas ativas em previous que não estão em current."""
+        if previous is None or previous < 0:
+            return
+        staying = set(self.active[current]) if current >= 0 else set()
+        for idx in self.active[previous]:
+            if idx not in staying:
+                release = getattr(self.clips[idx], "release", None)
+                if release is not None:
+                    release()
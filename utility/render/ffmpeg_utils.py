@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+import os
+import subprocess
+
+import numpy as np
+
+from moviepy.config import get_setting
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+
+
+def get_ffmpeg_binary() -> str:
+    """Retorna o binário do ffmpeg usado pelo moviepy (FFMPEG_BINARY ou imageio-ffmpeg)."""
+    return os.getenv('FFMPEG_BINARY') or get_setting("FFMPEG_BINARY")
+
+
+def run_ffmpeg(args: list) -> None:
+    """Executa o ffmpeg com os argumentos dados; levanta RuntimeError em caso de falha."""
+    cmd = [get_ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y"] + args
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(
+            f"ffmpeg falhou ({proc.returncode}): {proc.stderr.decode(errors='replace')}"
+        )
+
+
+def probe_media(path: str) -> dict:
+    """Lê duração, tamanho e fps do arquivo via ffmpeg (sem abrir um reader)."""
+    infos = ffmpeg_parse_infos(path)
+    return {
+        "duration": infos.get("duration"),
+        "size": infos.get("video_size"),
+        "fps": infos.get("video_fps"),
+    }
+
+
+def decode_pcm(path: str, sample_rate: int = 16000, data: bytes = None) -> np.ndarray:
+    """
+    Decodifica o áudio para PCM mono float32 em [-1, 1] na taxa dada
+    (mesmo formato do whisper.load_audio). Com data, decodifica os bytes
+    em memória (enviados pela stdin) e path é ignorado.
+    """
+    source = ["-i", "pipe:0"] if data is not None else ["-nostdin", "-i", path]
+    cmd = [
+        get_ffmpeg_binary(), "-hide_banner", "-loglevel", "error", *source,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(sample_rate), "-"
+    ]
+    proc = subprocess.run(cmd, input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        raise RuntimeError(
+            f"ffmpeg falhou ({proc.returncode}): {proc.stderr.decode(errors='replace')}"
+        )
+    return np.frombuffer(proc.stdout, np.int16).astype(np.float32) / 32768.0
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+import os
+import math
+import shutil
+import tempfile
+
+import numpy as np
+from moviepy.editor import VideoClip
+
+from utility.render.reader_pool import ReaderPool, VideoSource
+
+# Orçamento total de frames decodificados guardados (RAM + memmap)
+FRAME_STORE_MAX_BYTES = int(os.getenv('FRAME_STORE_MAX_BYTES', str(2 * 1024 ** 3)))
+# Acima disto, os frames vão para um arquivo .npy mapeado em memória
+FRAME_STORE_RAM_BYTES = int(os.getenv('FRAME_STORE_RAM_BYTES', str(256 * 1024 ** 2)))
+# Onde ficam os arquivos mapeados (padrão: diretório temporário do sistema)
+FRAME_STORE_DIR = os.getenv('FRAME_STORE_DIR') or None
+
+
+class FrameStore:
+    """
+    Guarda, já no tamanho alvo e no fps do render, os frames de vídeos que
+    seriam decodificados mais de uma vez (loop ou fallback do último fundo).
+    Cada vídeo é decodificado uma única vez; loops e reusos só indexam o array.
+    Cada camada de clip() conta um uso da entrada; quando a última sai de
+    cena, a entrada é liberada e o espaço volta ao orçamento.
+    """
+
+    def __init__(self, pool: ReaderPool, max_bytes: int = FRAME_STORE_MAX_BYTES,
+                 ram_bytes: int = FRAME_STORE_RAM_BYTES):
+        self.pool = pool
+        self.max_bytes = max_bytes
+        self.ram_bytes = ram_bytes
+        self._entries = {}
+        # argumentos de reserve por chave, para refazer uma entrada já liberada
+        self._specs = {}
+        self._reserved = 0
+        self._peak_reserved = 0
+        self._in_ram = 0
+        self._dir = None
+        self._files = 0
+        self.stats = {"stored": 0, "frames": 0, "reused": 0, "rejected": 0}
+
+    def reserve(self, path: str, width: int, height: int, fps: int,
+                duration: float, size: tuple = None) -> tuple:
+        """
+        Reserva espaço para os primeiros `duration` segundos do vídeo.
+        Retorna a chave da entrada ou None se não couber no orçamento.
+        """
+        key = (path, width, height, fps)
+        if key in self._entries:
+            self.stats["reused"] += 1
+            return key
+        n_frames = max(1, int(math.ceil(duration * fps - 1e-6)))
+        nbytes = n_frames * width * height * 3
+        if self._reserved + nbytes > self.max_bytes:
+            self.stats["rejected"] += 1
+            return None
+        self._add_entry(key, n_frames, nbytes, size)
+        return key
+
+    def _add_entry(self, key: tuple, n_frames: int, nbytes: int, size: tuple) -> dict:
+        path, width, height, fps = key
+        self._reserved += nbytes
+        self._peak_reserved = max(self._peak_reserved, self._reserved)
+        self._specs[key] = (n_frames, nbytes, size)
+        entry = self._entries[key] = {
+            "source": VideoSource(path, width, height, size=size),
+            "n_frames": n_frames,
+            "nbytes": nbytes,
+            "frames": None,
+            "ram_bytes": 0,
+            "uses": 0,
+        }
+        return entry
+
+    def frames(self, key: tuple) -> np.ndarray:
+        """Frames da entrada (n, h, w, 3), decodificados na primeira chamada."""
+        entry = self._entries.get(key)
+        if entry is None:
+            # camada pedida depois de liberada (frame fora de ordem): decodifica de novo
+            entry = self._add_entry(key, *self._specs[key])
+        if entry["frames"] is None:
+            entry["frames"] = self._decode(key, entry)
+        return entry["frames"]
+
+    def _allocate(self, entry: dict, n_frames: int) -> np.ndarray:
+        source = entry["source"]
+        shape = (n_frames, source.height, source.width, 3)
+        nbytes = n_frames * source.height * source.width * 3
+        if self._in_ram + nbytes <= self.ram_bytes:
+            self._in_ram += nbytes
+            entry["ram_bytes"] = nbytes
+            return np.empty(shape, dtype=np.uint8)
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix="frame_store_", dir=FRAME_STORE_DIR)
+        # contador próprio: com release, len(listdir) repetiria o nome de um arquivo vivo
+        path = os.path.join(self._dir, f"{self._files}.npy")
+        self._files += 1
+        return np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=shape)
+
+    def _decode(self, key: tuple, entry: dict) -> np.ndarray:
+        source = entry["source"]
+        fps = key[3]
+        reader = self.pool.acquire(source)
+        if reader is None:
+            return np.zeros((1, source.height, source.width, 3), dtype=np.uint8)
+
+        n_frames = min(entry["n_frames"], max(1, int(math.ceil(reader.duration * fps - 1e-6))))
+        frames = self._allocate(entry, n_frames)
+        try:
+            for i in range(n_frames):
+                frames[i] = reader.get_frame(i / fps)
+        finally:
+            self.pool.release(source)
+        self.stats["stored"] += 1
+        self.stats["frames"] += n_frames
+        return frames
+
+    def clip(self, key: tuple, duration: float) -> VideoClip:
+        """Camada de `duration` segundos que percorre (em loop) os frames da entrada."""
+        self._entries[key]["uses"] += 1
+        return StoreClip(self, key, duration)
+
+    def release_use(self, key: tuple) -> None:
+        """Uma camada da entrada saiu de cena; a última libera a entrada."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return
+        entry["uses"] -= 1
+        if entry["uses"] <= 0:
+            self.release(key)
+
+    def release(self, key: tuple) -> None:
+        """Descarta a entrada e devolve ao orçamento o espaço dela (RAM ou arquivo mapeado)."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._reserved -= entry["nbytes"]
+        self._in_ram -= entry["ram_bytes"]
+        frames = entry["frames"]
+        entry["frames"] = None
+        if isinstance(frames, np.memmap):
+            filename = frames.filename
+            del frames
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        """Libera os arrays e apaga os arquivos mapeados (as estatísticas ficam para o relatório)."""
+        for key in list(self._entries):
+            self.release(key)
+        self._reserved = 0
+        self._in_ram = 0
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    def report(self) -> dict:
+        return dict(self.stats, reserved_mb=self._peak_reserved / 1024 ** 2)
+
+
+class StoreClip(VideoClip):
+    """
+    Camada que percorre (em loop) os frames de uma entrada do FrameStore.
+    release() é chamado pelo IndexedCompositeVideoClip quando o segmento acaba.
+    """
+
+    def __init__(self, store: FrameStore, key: tuple, duration: float):
+        VideoClip.__init__(self, duration=duration)
+        self.store = store
+        self.key = key
+        self.size = (key[1], key[2])
+        self.released = False
+        self.make_frame = self._make_frame
+
+    def _make_frame(self, t):
+        frames = self.store.frames(self.key)
+        return frames[int(t * self.key[3] + 1e-6) % len(frames)]
+
+    def release(self) -> None:
+        # set_start copia a camada: a flag é por cópia, que é a que o compositor solta
+        if not self.released:
+            self.released = True
+            self.store.release_use(self.key)
+
+
+def format_store_report(report: dict) -> str:
+    """Resumo legível de FrameStore.report."""
+    return (
+        f"{report['stored']} vídeos decodificados uma vez ({report['frames']} frames, "
+        f"{report['reserved_mb']:.0f} MB reservados), {report['reused']} reusos, "
+        f"{report['rejected']} fora do orçamento"
+    )
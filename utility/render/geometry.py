@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+import math
+
+from moviepy.editor import VideoFileClip
+
+from utility.render.ffmpeg_utils import probe_media
+
+
+def fit_geometry(src_w: int, src_h: int, dst_w: int, dst_h: int) -> dict:
+    """
+    Calcula uma única vez como levar o vídeo de (src_w, src_h) a (dst_w, dst_h)
+    preenchendo o quadro: uma escala (feita pelo ffmpeg na decodificação)
+    seguida de um recorte central sem reamostragem.
+    Retorna {'decode_size': (w, h) ou None, 'crop': (x1, y1, x2, y2) ou None}.
+    """
+    if (src_w, src_h) == (dst_w, dst_h):
+        return {"decode_size": None, "crop": None}
+
+    # mesma proporção (tolerância de 1px): só escala
+    if abs(src_w * dst_h - src_h * dst_w) <= max(src_w, src_h):
+        return {"decode_size": (dst_w, dst_h), "crop": None}
+
+    scale = max(dst_w / src_w, dst_h / src_h)
+    dec_w = max(dst_w, int(math.ceil(src_w * scale)))
+    dec_h = max(dst_h, int(math.ceil(src_h * scale)))
+    x1 = (dec_w - dst_w) // 2
+    y1 = (dec_h - dst_h) // 2
+    return {"decode_size": (dec_w, dec_h), "crop": (x1, y1, x1 + dst_w, y1 + dst_h)}
+
+
+def open_fitted_clip(path: str, width: int, height: int, size: tuple = None, **kwargs) -> VideoFileClip:
+    """
+    Abre o vídeo já no tamanho alvo: o reader do ffmpeg decodifica direto em
+    decode_size e o recorte (se houver) é só um fatiamento do array.
+    Se o arquivo já estiver em width x height, nenhuma transformação é aplicada.
+    size: (w, h) da fonte, quando já conhecido, evita um probe extra.
+    """
+    if size is None:
+        size = probe_media(path)["size"]
+    geometry = fit_geometry(size[0], size[1], width, height)
+
+    target_resolution = None
+    if geometry["decode_size"]:
+        dec_w, dec_h = geometry["decode_size"]
+        target_resolution = (dec_h, dec_w)
+    clip = VideoFileClip(path, target_resolution=target_resolution, **kwargs)
+
+    if geometry["crop"]:
+        x1, y1, x2, y2 = geometry["crop"]
+        clip = clip.crop(x1=x1, y1=y1, x2=x2, y2=y2)
+    return clip
+
+
+def cover_crop_box(src_w: int, src_h: int, dst_w: int, dst_h: int) -> tuple:
+    """
+    Região central (x1, y1, x2, y2) de um quadro src_w x src_h com a proporção
+    de dst_w x dst_h: recortada e redimensionada, preenche o destino como
+    fit_geometry, mas sem escalar o quadro inteiro antes.
+    """
+    scale = max(dst_w / src_w, dst_h / src_h)
+    crop_w = min(src_w, int(round(dst_w / scale)))
+    crop_h = min(src_h, int(round(dst_h / scale)))
+    x1 = (src_w - crop_w) // 2
+    y1 = (src_h - crop_h) // 2
+    return x1, y1, x1 + crop_w, y1 + crop_h
+
+
+def ffmpeg_fit_filter(width: int, height: int) -> str:
+    """Mesma geometria de fit_geometry como filtros do ffmpeg (escala + recorte central)."""
+    return (
+        f"scale={width}:{height}:force_original_aspect_ratio=increase,"
+        f"crop={width}:{height}"
+    )
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+
+# Perfis de exportação: o final é o 1080p de sempre; o preview é para iterar
+# no roteiro e no timing sem pagar o custo do render completo.
+RENDER_PROFILES = {
+    "final": {"name": "final", "width": 1920, "height": 1080, "fps": 25, "preset": "veryfast"},
+    "preview": {"name": "preview", "width": 640, "height": 360, "fps": 15, "preset": "ultrafast"},
+    # corte vertical (Shorts/Reels): legenda mais alta, longe da interface dos apps
+    "portrait": {
+        "name": "portrait", "width": 1080, "height": 1920, "fps": 25, "preset": "veryfast",
+        "caption_y": 0.7,
+    },
+}
+FINAL_PROFILE = RENDER_PROFILES["final"]
+PREVIEW_PROFILE = RENDER_PROFILES["preview"]
+PORTRAIT_PROFILE = RENDER_PROFILES["portrait"]
+
+# Legenda de referência (desenhada para um quadro de 1080 no lado menor)
+REFERENCE_HEIGHT = 1080
+REFERENCE_FONT_SIZE = 48
+REFERENCE_STROKE_WIDTH = 2
+
+
+def get_profile(name: str) -> dict:
+    """Retorna o perfil pelo nome ('final', 'preview' ou 'portrait')."""
+    try:
+        return RENDER_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Perfil de render desconhecido: {name}")
+
+
+def master_profile(profiles: list) -> dict:
+    """
+    Perfil de maior resolução (empate: o de paisagem, como os fundos do
+    Pexels): decodificar e compor nele faz os demais só reduzirem/recortarem,
+    nunca ampliarem a partir de um quadro menor.
+    """
+    return max(profiles, key=lambda p: (p["width"] * p["height"], p["width"] >= p["height"]))
+
+
+def caption_style(profile: dict) -> dict:
+    """
+    Legenda na escala do perfil: fonte e contorno proporcionais ao lado menor
+    do quadro, wrap em 80% da largura e a frase a duas linhas de fonte da base
+    (ou na fração da altura dada por profile['caption_y']).
+    Retorna {'font_size', 'stroke_width', 'caption_width', 'y'}.
+    """
+    scale = min(profile["width"], profile["height"]) / REFERENCE_HEIGHT
+    font_size = max(8, int(round(REFERENCE_FONT_SIZE * scale)))
+    if profile.get("caption_y") is not None:
+        y = int(profile["height"] * profile["caption_y"])
+    else:
+        y = profile["height"] - font_size * 2
+    return {
+        "font_size": font_size,
+        "stroke_width": max(1, int(round(REFERENCE_STROKE_WIDTH * scale))),
+        "caption_width": int(profile["width"] * 0.8),
+        "y": y,
+    }
+
+
+def output_name(base: str, profile: dict) -> str:
+    """'rendered_video_x.mp4' -> 'rendered_video_x_preview.mp4' fora do perfil final."""
+    if profile["name"] == "final":
+        return base
+    root, ext = base.rsplit(".", 1)
+    return f"{root}_{profile['name']}.{ext}"
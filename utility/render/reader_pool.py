@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+import os
+import sys
+from collections import OrderedDict
+
+import numpy as np
+from moviepy.editor import VideoClip
+
+from utility.render.geometry import open_fitted_clip
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Máximo de decoders (subprocessos ffmpeg) abertos ao mesmo tempo
+MAX_OPEN_READERS = int(os.getenv('MAX_OPEN_READERS', '4'))
+
+
+def open_fd_count() -> int:
+    """Descritores abertos pelo processo (Linux/macOS); None se não der para medir."""
+    for fd_dir in ('/proc/self/fd', '/dev/fd'):
+        try:
+            return len(os.listdir(fd_dir))
+        except OSError:
+            continue
+    return None
+
+
+def peak_rss_mb() -> float:
+    """Pico de memória residente do processo e dos filhos já encerrados (MB)."""
+    if resource is None:
+        return None
+    usage = sum(
+        resource.getrusage(who).ru_maxrss
+        for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN)
+    )
+    # ru_maxrss vem em KiB no Linux e em bytes no macOS
+    return usage / 1024 ** 2 if sys.platform == 'darwin' else usage / 1024
+
+
+class VideoSource:
+    """Arquivo de fundo a ser aberto sob demanda, já no tamanho alvo."""
+
+    def __init__(self, path: str, width: int, height: int, size: tuple = None):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.size = size
+        self.failed = False
+
+    def open(self):
+        return open_fitted_clip(self.path, self.width, self.height, size=self.size, audio=False)
+
+
+class ReaderPool:
+    """
+    Limita quantos VideoFileClip ficam abertos: abre na primeira leitura,
+    fecha quando o segmento sai de cena (release) e, se o limite estourar,
+    fecha o leitor usado há mais tempo.
+    """
+
+    def __init__(self, max_open: int = MAX_OPEN_READERS):
+        self.max_open = max(max_open, 1)
+        self._open = OrderedDict()  # VideoSource -> clip aberto
+        self.stats = {"opened": 0, "closed": 0, "peak_open": 0, "peak_fds": open_fd_count()}
+
+    def acquire(self, source: VideoSource):
+        """Leitor aberto para source (ou None se o arquivo não abre)."""
+        clip = self._open.get(source)
+        if clip is not None:
+            self._open.move_to_end(source)
+            return clip
+        if source.failed:
+            return None
+
+        while len(self._open) >= self.max_open:
+            self.release(next(iter(self._open)))
+        try:
+            clip = source.open()
+        except Exception as e:
+            print(f"⚠️ Falha ao carregar vídeo '{source.path}': {e}")
+            source.failed = True
+            return None
+
+        self._open[source] = clip
+        self.stats["opened"] += 1
+        self.stats["peak_open"] = max(self.stats["peak_open"], len(self._open))
+        fds = open_fd_count()
+        if fds is not None:
+            self.stats["peak_fds"] = max(self.stats["peak_fds"] or 0, fds)
+        return clip
+
+    def release(self, source: VideoSource) -> None:
+        """Fecha o leitor de source, se estiver aberto."""
+        clip = self._open.pop(source, None)
+        if clip is not None:
+            clip.close()
+            self.stats["closed"] += 1
+
+    def close_all(self) -> None:
+        for source in list(self._open):
+            self.release(source)
+
+    def report(self) -> dict:
+        return dict(self.stats, max_open=self.max_open, peak_rss_mb=peak_rss_mb())
+
+
+class LazyVideoClip(VideoClip):
+    """
+    Fundo que só abre o decoder quando o primeiro frame é pedido.
+    Vídeos mais curtos que o segmento voltam ao início (como o fx loop).
+    release() é chamado pelo IndexedCompositeVideoClip quando o segmento acaba.
+    """
+
+    def __init__(self, pool: ReaderPool, path: str, width: int, height: int,
+                 duration: float, size: tuple = None):
+        VideoClip.__init__(self, duration=duration)
+        self.pool = pool
+        self.source = VideoSource(path, width, height, size=size)
+        self.size = (width, height)
+        self.make_frame = self._make_frame
+
+    def _make_frame(self, t):
+        reader = self.pool.acquire(self.source)
+        if reader is None:
+            return np.zeros((self.source.height, self.source.width, 3), dtype=np.uint8)
+        if reader.duration and t >= reader.duration:
+            t = t % reader.duration
+        return reader.get_frame(t)
+
+    def release(self) -> None:
+        self.pool.release(self.source)
+
+
+def format_resource_report(report: dict) -> str:
+    """Resumo legível de ReaderPool.report."""
+    rss = report["peak_rss_mb"]
+    return (
+        f"{report['opened']} leitores abertos, {report['closed']} fechados, "
+        f"pico de {report['peak_open']}/{report['max_open']} simultâneos, "
+        f"pico de {report['peak_fds']} descritores, "
+        f"RSS máximo {'n/d' if rss is None else f'{rss:.0f} MB'}"
+    )
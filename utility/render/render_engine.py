@@ -1,9 +1,4 @@
 #!/usr/bin/env python3
-import os
-import tempfile
-import platform
-import subprocess
-import requests
 from PIL import Image as PilImage
 # Monkey-patch ANTIALIAS for Pillow ≥10
 if not hasattr(PilImage, 'ANTIALIAS'):
@@ -11,15 +6,16 @@ if not hasattr(PilImage, 'ANTIALIAS'):
 
 from moviepy.editor import (
     AudioFileClip,
-    CompositeVideoClip,
     CompositeAudioClip,
-    ColorClip,
-    TextClip,
-    VideoFileClip
+    ColorClip
 )
-from moviepy import video as mpy_video
 from moviepy.video.fx.all import loop
 
+from utility.render.compositor import IndexedCompositeVideoClip
+from utility.video.media_cache import fetch_all, format_cache_report
+from utility.render.geometry import open_fitted_clip
+from utility.render.caption_rasterizer import caption_clip
+
 # Resolução alvo 16:9
 target_width, target_height = 1920, 1080
 # Configurações de legenda
@@ -27,24 +23,6 @@ font_size = 48
 caption_width = int(target_width * 0.8)  # largura máxima para wrap
 
 
-def download_file(url: str, filename: str) -> None:
-    """Baixa o arquivo da URL para o caminho local."""
-    headers = {"User-Agent": "Mozilla/5.0"}
-    resp = requests.get(url, headers=headers, timeout=30)
-    resp.raise_for_status()
-    with open(filename, 'wb') as f:
-        f.write(resp.content)
-
-
-def find_imagemagick() -> str:
-    """Procura o binário do ImageMagick no sistema."""
-    cmd = "where" if platform.system() == "Windows" else "which"
-    try:
-        return subprocess.check_output([cmd, 'magick']).decode().strip()
-    except Exception:
-        return None
-
-
 def get_output_media(
     audio_file_path: str,
     timed_captions: list,
@@ -54,30 +32,26 @@ def get_output_media(
     """
     Gera e exporta o vídeo final com background, legendas e áudio.
     """
-    # Configura ImageMagick para TextClip
-    im_path = find_imagemagick()
-    if im_path:
-        os.environ['IMAGEMAGICK_BINARY'] = im_path
-    else:
-        print("⚠️ ImageMagick não encontrado, fontes e cores podem não funcionar!")
-
-    temp_files = []
     visual_clips = []
     last_bg_clip = None
 
-    # 1) Processa clipes de fundo
+    # 1) Processa clipes de fundo (cache local; ausentes baixados em paralelo)
+    entries, report = fetch_all([url for _, url in background_video_data])
+    print(f"Fundos: {format_cache_report(report)}")
+
     for (t1, t2), video_url in background_video_data:
         segment_dur = t2 - t1
         bg = None
 
         if video_url:
-            # Baixa vídeo
-            tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
-            temp_files.append(tmp_file)
-            download_file(video_url, tmp_file)
-            # Tenta carregar o clip; se falhar, cai no fallback
+            # Tenta carregar o clip baixado; se falhar, cai no fallback
             try:
-                raw = VideoFileClip(tmp_file)
+                entry = entries[video_url]
+                if entry is None:
+                    raise IOError("download falhou")
+                raw = open_fitted_clip(
+                    entry["path"], target_width, target_height, size=entry["meta"]["size"]
+                )
                 # Cria clipe de duração exata (loop se necessário)
                 if raw.duration >= segment_dur:
                     bg = raw.subclip(0, segment_dur)
@@ -99,39 +73,28 @@ def get_output_media(
         if bg is None:
             bg = ColorClip((target_width, target_height), color=(0, 0, 0), duration=segment_dur)
 
-        # Ajusta posição e tamanho
+        # Ajusta posição (o tamanho já sai certo de open_fitted_clip)
         bg = bg.set_start(t1)
-        bg = bg.resize(height=target_height)
-        if bg.w < target_width:
-            bg = bg.fx(
-                mpy_video.crop,
-                width=target_width,
-                height=target_height,
-                x_center=bg.w / 2,
-                y_center=bg.h / 2
-            )
-        bg = bg.resize((target_width, target_height))
         visual_clips.append(bg)
 
     # 2) Processa legendas
     for (t1, t2), txt in timed_captions:
         # Escapa aspas tipográficas
         safe_txt = txt.replace('“', '"').replace('”', '"').replace('’', "'").replace('–', '-')
-        text_clip = TextClip(
+        text_clip = caption_clip(
             safe_txt,
             fontsize=font_size,
             color="white",
             stroke_width=2,
             stroke_color="black",
-            method="caption",
-            size=(caption_width, None),
+            width=caption_width,
             align="center"
         ).set_start(t1).set_end(t2)
         text_clip = text_clip.set_position(("center", target_height - font_size * 2))
         visual_clips.append(text_clip)
 
     # 3) Composição final
-    final = CompositeVideoClip(visual_clips, size=(target_width, target_height))
+    final = IndexedCompositeVideoClip(visual_clips, size=(target_width, target_height))
 
     # 4) Adiciona áudio
     audio = CompositeAudioClip([AudioFileClip(audio_file_path)])
@@ -147,11 +110,4 @@ def get_output_media(
         preset='veryfast'
     )
 
-    # 6) Limpeza de arquivos temporários
-    for fpath in temp_files:
-        try:
-            os.remove(fpath)
-        except OSError:
-            pass
-
     return output
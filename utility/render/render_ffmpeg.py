@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from utility.audio.narration import load_narration
+from utility.render.ffmpeg_utils import run_ffmpeg
+from utility.render.geometry import ffmpeg_fit_filter
+from utility.video.media_cache import fetch_all, format_cache_report
+from utility.render.profiles import FINAL_PROFILE, caption_style, output_name
+from utility.render.render_karaoke import build_phrase_karaoke
+
+
+def _timeline_segments(background_video_data: list) -> list:
+    """
+    Converte background_video_data em segmentos contíguos [(t1, t2, url), ...].
+    Buracos viram tela preta (url=False) e sobreposições são
+    resolvidas como no moviepy: o segmento seguinte fica por cima.
+    """
+    items = sorted(
+        ((float(t1), float(t2), url) for (t1, t2), url in background_video_data),
+        key=lambda item: item[0]
+    )
+    segments = []
+    cursor = 0.0
+    for i, (t1, t2, url) in enumerate(items):
+        if i + 1 < len(items):
+            t2 = min(t2, items[i + 1][0])
+        if t1 > cursor:
+            segments.append((cursor, t1, False))
+        if t2 > t1:
+            segments.append((t1, t2, url))
+        cursor = max(cursor, t2)
+    return segments
+
+
+def _filter_path(path: str) -> str:
+    """Escapa um caminho para uso como opção dentro do filtergraph."""
+    return os.path.abspath(path).replace('\\', '/').replace(':', '\\:').replace("'", "\\'")
+
+
+def write_caption_track(timed_captions: list, words: list, work_dir: str, profile: dict = FINAL_PROFILE) -> tuple:
+    """
+    Legendas karaokê como uma única entrada do ffmpeg: cada estado visível
+    (frase em branco, frase com a palavra ativa em amarelo, ou nada) vira um
+    PNG do tamanho da maior frase, listado com sua duração num arquivo
+    ffconcat. Uma entrada e um overlay, qualquer que seja o tamanho do roteiro.
+    Retorna (caminho do .ffconcat, largura, altura) ou None sem legendas.
+    """
+    phrases = [
+        (t1, t2, build_phrase_karaoke(t1, t2, txt, words, profile=profile))
+        for (t1, t2), txt in timed_captions
+    ]
+    if not phrases:
+        return None
+    canvas_w = max(phrase["base"].shape[1] for _, _, phrase in phrases)
+    canvas_h = max(phrase["base"].shape[0] for _, _, phrase in phrases)
+
+    def save(image) -> str:
+        canvas = np.zeros((canvas_h, canvas_w, 4), dtype=np.uint8)
+        h, w = image.shape[:2]
+        x = (canvas_w - w) // 2
+        canvas[:h, x:x + w] = image
+        path = os.path.join(work_dir, f"cap_{len(states)}.png")
+        Image.fromarray(canvas, "RGBA").save(path, compress_level=1)
+        return path
+
+    states = []  # [(início, caminho)]; cada estado vale até o início do seguinte
+    blank = save(np.zeros((1, 1, 4), dtype=np.uint8))
+    states.append((0.0, blank))
+    for t1, t2, phrase in phrases:
+        t1 = max(t1, states[-1][0])
+        base_png = save(phrase["base"])
+        states.append((t1, base_png))
+        for start, end, (x0, y0, x1, y1) in sorted(phrase["timeline"]):
+            start, end = max(t1 + start, states[-1][0]), min(t1 + end, t2)
+            if end <= start:
+                continue
+            frame = phrase["base"].copy()
+            frame[y0:y1, x0:x1] = phrase["active"][y0:y1, x0:x1]
+            states.append((start, save(frame)))
+            states.append((end, base_png))
+        states.append((t2, blank))
+
+    lines = ["ffconcat version 1.0"]
+    for (start, path), (end, _) in zip(states, states[1:]):
+        if end > start:
+            lines += [f"file '{os.path.basename(path)}'", f"duration {end - start:.6f}"]
+    # o último estado (em branco) segue até o fim do vídeo
+    lines.append(f"file '{os.path.basename(blank)}'")
+    list_path = os.path.join(work_dir, "captions.ffconcat")
+    with open(list_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return list_path, canvas_w, canvas_h
+
+
+def build_ffmpeg_command(
+    audio_file_path: str,
+    timed_captions: list,
+    words: list,
+    background_video_data: list,
+    output: str,
+    work_dir: str,
+    subtitles_path: str = None,
+    profile: dict = FINAL_PROFILE
+) -> list:
+    """
+    Monta os argumentos de uma única invocação do ffmpeg que reproduz
+    render_karaoke.get_output_media: trim/scale/concat dos fundos, overlay das
+    legendas karaokê (uma trilha de PNGs, ver write_caption_track) e mux do áudio.
+    Com subtitles_path (.ass), as legendas são desenhadas pelo libass.
+    Resolução, fps e preset vêm do perfil (ver profiles.py).
+    """
+    width, height, fps = profile["width"], profile["height"], profile["fps"]
+    inputs = []  # um grupo de argumentos por entrada; o índice é a posição na lista
+    filters = []
+    labels = []
+    last_file = None
+
+    # 1) Fundos: resolve tudo pelo cache; cada segmento vira uma entrada em loop
+    segments = _timeline_segments(background_video_data)
+    entries, report = fetch_all([video_url for _, _, video_url in segments])
+    print(f"Fundos: {format_cache_report(report)}")
+
+    for k, (t1, t2, video_url) in enumerate(segments):
+        segment_dur = t2 - t1
+        source = None
+        if video_url:
+            if entries[video_url]:
+                source = entries[video_url]["path"]
+                last_file = source
+        elif video_url is None:
+            # Fallback: reaproveita o último vídeo baixado
+            source = last_file
+
+        idx = len(inputs)
+        if source:
+            inputs.append(["-stream_loop", "-1", "-i", source])
+        else:
+            inputs.append(["-f", "lavfi", "-i", f"color=c=black:s={width}x{height}:r={fps}"])
+        filters.append(
+            f"[{idx}:v]fps={fps},trim=duration={segment_dur:.3f},setpts=PTS-STARTPTS,"
+            f"{ffmpeg_fit_filter(width, height)},setsar=1,format=yuv420p[bg{k}]"
+        )
+        labels.append(f"[bg{k}]")
+
+    narration = load_narration(audio_file_path)
+    audio_duration = narration.duration
+    if labels:
+        filters.append(
+            f"{''.join(labels)}concat=n={len(labels)}:v=1:a=0,"
+            f"tpad=stop=-1:stop_mode=add:color=black,trim=duration={audio_duration:.3f}[base]"
+        )
+    else:
+        idx = len(inputs)
+        inputs.append(["-f", "lavfi", "-i", f"color=c=black:s={width}x{height}:r={fps}"])
+        filters.append(f"[{idx}:v]trim=duration={audio_duration:.3f}[base]")
+
+    # 2) Legendas: uma trilha de estados (frase / palavra ativa) sobre o fundo
+    current = "[base]"
+    if subtitles_path:
+        filters.append(f"[base]subtitles=filename='{_filter_path(subtitles_path)}'[subs]")
+        current = "[subs]"
+    else:
+        track = write_caption_track(timed_captions, words, work_dir, profile=profile)
+        if track:
+            list_path, track_w, _ = track
+            idx = len(inputs)
+            inputs.append(["-f", "concat", "-safe", "0", "-i", list_path])
+            filters.append(
+                f"[base][{idx}:v]overlay=x={(width - track_w) // 2}:y={caption_style(profile)['y']}:"
+                f"eof_action=repeat[caps]"
+            )
+            current = "[caps]"
+
+    audio_idx = len(inputs)
+    inputs.append(["-i", narration.aac()])
+
+    script_path = os.path.join(work_dir, "filtergraph.txt")
+    with open(script_path, "w", encoding="utf-8") as f:
+        f.write(";\n".join(filters))
+
+    return [arg for group in inputs for arg in group] + [
+        "-filter_complex_script", script_path,
+        "-map", current,
+        "-map", f"{audio_idx}:a",
+        "-c:v", "libx264",
+        "-preset", profile["preset"],
+        "-pix_fmt", "yuv420p",
+        "-r", str(fps),
+        "-c:a", "copy",
+        "-t", f"{audio_duration:.3f}",
+        output
+    ]
+
+
+def get_output_media(
+    audio_file_path: str,
+    timed_captions: list,
+    words: list,
+    background_video_data: list,
+    video_server: str,
+    output: str = None,
+    subtitles_path: str = None,
+    profile: dict = FINAL_PROFILE
+) -> str:
+    """
+    Backend alternativo ao render_karaoke: mesma saída, mas decodificação,
+    escala, composição e encode ficam todos no pipeline do ffmpeg.
+    subtitles_path: arquivo .ass (ver captions.ass_exporter) para burn-in via libass.
+    """
+    output = output or output_name("rendered_video_ffmpeg.mp4", profile)
+    work_dir = tempfile.mkdtemp(prefix="render_ffmpeg_")
+    try:
+        args = build_ffmpeg_command(
+            audio_file_path, timed_captions, words, background_video_data, output, work_dir,
+            subtitles_path=subtitles_path, profile=profile
+        )
+        run_ffmpeg(args)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return output
@@ -1,199 +1,279 @@
 #!/usr/bin/env python3
 import os
-import tempfile
-import platform
-import subprocess
-import requests
+from bisect import bisect_right
+
+import numpy as np
 from PIL import Image as PilImage
 # Monkey-patch ANTIALIAS para Pillow ≥10
 if not hasattr(PilImage, 'ANTIALIAS'):
     PilImage.ANTIALIAS = PilImage.Resampling.LANCZOS
 
 from moviepy.editor import (
-    AudioFileClip,
-    CompositeVideoClip,
-    CompositeAudioClip,
     ColorClip,
-    TextClip,
-    VideoFileClip
+    ImageClip,
+    VideoClip
 )
-from moviepy import video as mpy_video
-from moviepy.video.fx.all import loop
 
-# Resolução alvo 16:9
-target_width, target_height = 1920, 1080
-# Configurações de legenda
-font_size = 48
-caption_width = int(target_width * 0.8)  # largura máxima para wrap
+from utility.audio.narration import load_narration
+from utility.render.background_normalizer import normalize_backgrounds
+from utility.video.media_cache import fetch_all, format_cache_report
+from utility.render.compositor import IndexedCompositeVideoClip
+from utility.render.reader_pool import LazyVideoClip, ReaderPool, format_resource_report
+from utility.render.frame_store import FrameStore, format_store_report
+from utility.render.caption_rasterizer import layout_caption, render_caption
+from utility.render.profiles import FINAL_PROFILE, caption_style, output_name
+from utility.captions.word_matching import match_phrase_words
 
+# Pré-normaliza os fundos antes do render (ver background_normalizer)
+PRENORMALIZE = os.getenv('PRENORMALIZE_BACKGROUNDS', '0') == '1'
 
-def download_file(url: str, filename: str) -> None:
-    """Baixa o arquivo da URL para o caminho local."""
-    headers = {"User-Agent": "Mozilla/5.0"}
-    resp = requests.get(url, headers=headers, timeout=30)
-    resp.raise_for_status()
-    with open(filename, 'wb') as f:
-        f.write(resp.content)
 
+def safe_caption_text(txt: str) -> str:
+    """Troca aspas e travessões tipográficos por equivalentes ASCII."""
+    return txt.replace('“', '"').replace('”', '"').replace('’', "'").replace('–', '-')
 
-def find_imagemagick() -> str:
-    """Procura o binário do ImageMagick no sistema."""
-    cmd = "where" if platform.system() == "Windows" else "which"
-    try:
-        return subprocess.check_output([cmd, 'magick']).decode().strip()
-    except Exception:
-        return None
 
+def karaoke_layer(base: np.ndarray, active: np.ndarray, timeline: list, duration: float) -> VideoClip:
+    """
+    Camada única de karaokê para uma frase.
+    base/active: bitmaps RGBA da frase inteira (branco e amarelo);
+    timeline: [(start, end, (x0, y0, x1, y1)), ...] relativo ao início da frase.
+    A cada frame apenas a caixa da palavra ativa é trocada pela versão amarela.
+    """
+    starts = [start for start, _, _ in timeline]
+    base_rgb = base[:, :, :3]
+    current = {}
+
+    def make_frame(t):
+        i = bisect_right(starts, t) - 1
+        if i < 0 or t >= timeline[i][1]:
+            return base_rgb
+        if i not in current:
+            x0, y0, x1, y1 = timeline[i][2]
+            frame = base_rgb.copy()
+            frame[y0:y1, x0:x1] = active[y0:y1, x0:x1, :3]
+            current.clear()
+            current[i] = frame
+        return current[i]
+
+    clip = VideoClip(make_frame, duration=duration)
+    mask = ImageClip(base[:, :, 3] / 255.0, ismask=True).set_duration(duration)
+    return clip.set_mask(mask)
 
-def create_karaoke_clips(words: list, font_size: int = 48):
+
+def build_phrase_karaoke(t1: float, t2: float, txt: str, words: list, profile: dict = FINAL_PROFILE) -> dict:
     """
-    Cria clipes de legendas estilo karaokê.
-    Cada palavra tem:
-      - Texto branco (base) visível durante toda a frase.
-      - Texto amarelo visível apenas enquanto a palavra é falada.
+    Rasteriza a frase (branca e amarela) na escala do perfil e calcula a linha
+    do tempo das palavras.
+    Retorna {'base', 'active', 'timeline'}, com timeline relativa a t1.
     """
+    safe_txt = safe_caption_text(txt)
+    caption = caption_style(profile)
+    style = dict(
+        fontsize=caption["font_size"],
+        stroke_width=caption["stroke_width"],
+        stroke_color="black",
+        width=caption["caption_width"],
+        align="center"
+    )
+    base = render_caption(safe_txt, color="white", **style)
+    active = render_caption(safe_txt, color="yellow", **style)
+    boxes = layout_caption(
+        safe_txt,
+        fontsize=caption["font_size"],
+        stroke_width=caption["stroke_width"],
+        width=caption["caption_width"],
+        align="center"
+    )["boxes"]
+
+    phrase_words = [w for w in words if t1 <= w["start"] < t2]
+    matches = match_phrase_words(safe_txt.split(), phrase_words)
+    timeline = [
+        (w["start"] - t1, w["end"] - t1, boxes[idx])
+        for w, idx in zip(phrase_words, matches)
+        if idx is not None
+    ]
+    return {"base": base, "active": active, "timeline": timeline}
+
+
+def create_karaoke_clips(timed_captions: list, words: list, profile: dict = FINAL_PROFILE):
+    """
+    Cria uma camada de karaokê por frase de timed_captions.
+    A frase é rasterizada uma vez em branco e uma vez em amarelo; enquanto
+    cada palavra é falada, sua caixa na frase aparece em amarelo.
+    """
+    y = caption_style(profile)["y"]
     clips = []
-    for word in words:
-        start, end, text = word["start"], word["end"], word["text"]
-
-        # Texto base (sempre branco)
-        base_clip = TextClip(
-            text,
-            fontsize=font_size,
-            color="white",
-            stroke_width=2,
-            stroke_color="black",
-            method="caption",
-            size=(caption_width, None),
-            align="center"
-        ).set_start(start).set_end(end).set_position(("center", target_height - font_size * 2))
-        clips.append(base_clip)
-
-        # Texto ativo (amarelo) sobreposto enquanto a palavra é dita
-        active_clip = TextClip(
-            text,
-            fontsize=font_size,
-            color="yellow",
-            stroke_width=2,
-            stroke_color="black",
-            method="caption",
-            size=(caption_width, None),
-            align="center"
-        ).set_start(start).set_end(end).set_position(("center", target_height - font_size * 2))
-        clips.append(active_clip)
+    for (t1, t2), txt in timed_captions:
+        phrase = build_phrase_karaoke(t1, t2, txt, words, profile=profile)
+        layer = karaoke_layer(phrase["base"], phrase["active"], phrase["timeline"], duration=t2 - t1)
+        layer = layer.set_start(t1).set_position(("center", y))
+        clips.append(layer)
+
+    return clips
+
+
+def build_background_clips(
+    background_video_data: list,
+    profile: dict = FINAL_PROFILE,
+    pool: ReaderPool = None,
+    store: FrameStore = None
+) -> list:
+    """
+    Obtém (via cache local) e prepara os clipes de fundo (loop, fallback e
+    ajuste à resolução do perfil).
+    Os decoders são abertos sob demanda pelo pool e fechados quando o
+    segmento sai de cena (ver reader_pool). Com store, vídeos mais curtos que
+    o segmento ou reaproveitados pelo fallback são decodificados uma única vez
+    (ver frame_store).
+    """
+    width, height, fps = profile["width"], profile["height"], profile["fps"]
+    pool = pool or ReaderPool()
+    clips = []
+    last_entry = None
+
+    # Resolve todos os fundos de uma vez (cache; ausentes baixados em paralelo)
+    entries, report = fetch_all([url for _, url in background_video_data])
+    print(f"Fundos: {format_cache_report(report)}")
+
+    segments = []
+    for (t1,t2),video_url in background_video_data:
+        entry = None
+        if video_url:
+            entry = entries[video_url]
+            if entry is None:
+                print(f"⚠️ Falha ao carregar vídeo '{video_url}': download falhou")
+            else:
+                last_entry = entry
+        else:
+            # Fallback: reaproveita o último vídeo carregado
+            entry = last_entry
+        segments.append((float(t1), float(t2) - float(t1), entry))
+
+    # Quanto de cada vídeo é usado e por quantos segmentos
+    needed = {}
+    uses = {}
+    for _, segment_dur, entry in segments:
+        if entry:
+            needed[entry["path"]] = max(needed.get(entry["path"], 0.0), segment_dur)
+            uses[entry["path"]] = uses.get(entry["path"], 0) + 1
+
+    for t1, segment_dur, entry in segments:
+        bg = None
+        if entry:
+            path, meta = entry["path"], entry["meta"]
+            if store is not None and (uses[path] > 1 or meta["duration"] < needed[path]):
+                key = store.reserve(
+                    path, width, height, fps,
+                    min(meta["duration"], needed[path]), size=meta["size"]
+                )
+                if key:
+                    bg = store.clip(key, segment_dur)
+            if bg is None:
+                bg = LazyVideoClip(pool, path, width, height, segment_dur, size=meta["size"])
+        else:
+            bg = ColorClip((width, height), color=(0, 0, 0), duration=segment_dur)
+
+        bg = bg.set_start(t1)
+        clips.append(bg)
 
     return clips
 
 
+def build_normalized_background_clips(
+    normalized_video_data: list,
+    profile: dict = FINAL_PROFILE,
+    pool: ReaderPool = None
+) -> list:
+    """
+    Abre os intermediários de background_normalizer: já estão na resolução e
+    no fps do perfil e com a duração do segmento, então não há resize nem loop
+    por frame. Também são abertos sob demanda pelo pool.
+    """
+    width, height = profile["width"], profile["height"]
+    pool = pool or ReaderPool()
+    clips = []
+    for (t1, t2), path in normalized_video_data:
+        segment_dur = float(t2) - float(t1)
+        if path:
+            bg = LazyVideoClip(pool, path, width, height, segment_dur, size=(width, height))
+        else:
+            bg = ColorClip((width, height), color=(0, 0, 0), duration=segment_dur)
+        clips.append(bg.set_start(t1))
+    return clips
+
+
 def get_output_media(
     audio_file_path: str,
     timed_captions: list,
     words: list,  # NOVO: lista de palavras para karaokê
     background_video_data: list,
-    video_server: str
-
-) -> str:
+    video_server: str,
+    prenormalize: bool = PRENORMALIZE,
+    profile: dict = FINAL_PROFILE,
+    profiles: list = None
+):
     """
     Gera e exporta o vídeo final com background, legendas (karaokê) e áudio.
+    Com prenormalize=True, os fundos são transcodificados antes (em paralelo e
+    com cache) para a resolução/fps do perfil e o render só compõe as legendas.
+    profile: ver profiles.py (PREVIEW_PROFILE para um rascunho rápido em 360p).
+    profiles: vários perfis (ex. [FINAL_PROFILE, PORTRAIT_PROFILE]) gerados num
+    único passe (ver render_multi); nesse caso retorna a lista de arquivos.
     """
+    if profiles:
+        from utility.render.render_multi import render_profiles
+        return render_profiles(
+            audio_file_path, timed_captions, words, background_video_data, profiles,
+            prenormalize=prenormalize
+        )
+
     print(f'words: {(words)}')
     print(f'back data: {(background_video_data)}')
-    # Configura ImageMagick para TextClip
-    im_path = find_imagemagick()
-    if im_path:
-        os.environ['IMAGEMAGICK_BINARY'] = im_path
-
-    temp_files = []
     visual_clips = []
-    last_bg_clip = None
 
     print("DEBUG background_video_data:", background_video_data)
 
+    pool = ReaderPool()
+    store = FrameStore(pool)
 
     # 1) Processa clipes de fundo
-    for (t1,t2),video_url in background_video_data:
-
-        segment_dur = float(t2) - float(t1)
-        bg = None
-
-        if video_url:
-            tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
-            temp_files.append(tmp_file)
-            download_file(video_url, tmp_file)
-            try:
-                raw = VideoFileClip(tmp_file)
-                if raw.duration >= segment_dur:
-                    bg = raw.subclip(0, segment_dur)
-                else:
-                    bg = raw.subclip(0, raw.duration).fx(loop, duration=segment_dur)
-                last_bg_clip = bg
-            except Exception as e:
-                print(f"⚠️ Falha ao carregar vídeo '{video_url}': {e}")
-                bg = None
-        else:
-            if last_bg_clip:
-                if last_bg_clip.duration >= segment_dur:
-                    bg = last_bg_clip.subclip(0, segment_dur)
-                else:
-                    bg = last_bg_clip.fx(loop, duration=segment_dur)
+    if prenormalize:
+        normalized = normalize_backgrounds(
+            background_video_data, width=profile["width"], height=profile["height"], fps=profile["fps"]
+        )
+        visual_clips.extend(build_normalized_background_clips(normalized, profile=profile, pool=pool))
+    else:
+        visual_clips.extend(build_background_clips(
+            background_video_data, profile=profile, pool=pool, store=store
+        ))
 
-        if bg is None:
-            bg = ColorClip((target_width, target_height), color=(0, 0, 0), duration=segment_dur)
-
-        bg = bg.set_start(t1)
-        bg = bg.resize(height=target_height)
-        if bg.w < target_width:
-            bg = bg.fx(
-                mpy_video.crop,
-                width=target_width,
-                height=target_height,
-                x_center=bg.w / 2,
-                y_center=bg.h / 2
-            )
-        bg = bg.resize((target_width, target_height))
-        visual_clips.append(bg)
-
-    # 2) Adiciona legendas karaokê (palavra por palavra)
-    karaoke_clips = create_karaoke_clips(words, font_size=font_size)
+    # 2) Adiciona legendas karaokê (uma camada por frase)
+    karaoke_clips = create_karaoke_clips(timed_captions, words, profile=profile)
     visual_clips.extend(karaoke_clips)
 
-    # (Opcional) se quiser manter legendas de frase também:
-    for (t1, t2), txt in timed_captions:
-        safe_txt = txt.replace('“', '"').replace('”', '"').replace('’', "'").replace('–', '-')
-        text_clip = TextClip(
-            safe_txt,
-            fontsize=font_size,
-            color="white",
-            stroke_width=2,
-            stroke_color="black",
-            method="caption",
-            size=(caption_width, None),
-            align="center"
-        ).set_start(t1).set_end(t2).set_position(("center", target_height - font_size * 4))
-        visual_clips.append(text_clip)
-
     # 3) Composição final
-    final = CompositeVideoClip(visual_clips, size=(target_width, target_height))
+    final = IndexedCompositeVideoClip(visual_clips, size=(profile["width"], profile["height"]))
 
-    # 4) Adiciona áudio
-    audio = CompositeAudioClip([AudioFileClip(audio_file_path)])
-    final = final.set_audio(audio).set_duration(audio.duration)
+    # 4) Áudio: a narração já decodificada (narration) vira um AAC codificado
+    # uma vez e copiado para o mp4, sem o loop de áudio do moviepy
+    narration = load_narration(audio_file_path)
+    final = final.set_duration(narration.duration)
 
     # 5) Exporta
-    output = "rendered_video_karaoke.mp4"
-    final.write_videofile(
-        output,
-        codec='libx264',
-        audio_codec='aac',
-        fps=25,
-        preset='veryfast'
-    )
-
-    # 6) Limpeza de arquivos temporários
-    for fpath in temp_files:
-        try:
-            os.remove(fpath)
-        except OSError:
-            pass
+    output = output_name("rendered_video_karaoke.mp4", profile)
+    try:
+        final.write_videofile(
+            output,
+            codec='libx264',
+            audio=narration.aac(),
+            fps=profile["fps"],
+            preset=profile["preset"]
+        )
+    finally:
+        pool.close_all()
+        store.close()
+    print(f"Recursos: {format_resource_report(pool.report())}")
+    print(f"Frames reaproveitados: {format_store_report(store.report())}")
 
     return output
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+import numpy as np
+from PIL import Image
+from moviepy.editor import VideoClip
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+
+from utility.audio.narration import load_narration
+from utility.render.compositor import IndexedCompositeVideoClip
+from utility.render.frame_store import FrameStore, format_store_report
+from utility.render.geometry import cover_crop_box
+from utility.render.profiles import master_profile, output_name
+from utility.render.reader_pool import ReaderPool, format_resource_report
+from utility.render.render_karaoke import (
+    build_background_clips,
+    build_normalized_background_clips,
+    create_karaoke_clips
+)
+
+
+class SharedFrame:
+    """
+    Guarda o último frame do fundo comum: num mesmo instante, todos os perfis
+    recebem o mesmo array, então cada frame é decodificado e composto uma vez.
+    """
+
+    def __init__(self, clip):
+        self.clip = clip
+        self._t = None
+        self._frame = None
+
+    def get(self, t):
+        if t != self._t:
+            self._frame = self.clip.get_frame(t).astype("uint8", copy=False)
+            self._t = t
+        return self._frame
+
+
+def profile_view(shared: SharedFrame, master_size: tuple, profile: dict) -> VideoClip:
+    """Fundo comum recortado (centro) e redimensionado para o quadro do perfil."""
+    size = (profile["width"], profile["height"])
+    if size == tuple(master_size):
+        make_frame = shared.get
+    else:
+        x1, y1, x2, y2 = cover_crop_box(master_size[0], master_size[1], *size)
+
+        def make_frame(t):
+            region = shared.get(t)[y1:y2, x1:x2]
+            if (x2 - x1, y2 - y1) == size:
+                return region
+            return np.asarray(Image.fromarray(region).resize(size, Image.BILINEAR))
+
+    clip = VideoClip(duration=shared.clip.duration)
+    clip.make_frame = make_frame
+    clip.size = size
+    return clip
+
+
+def render_profiles(
+    audio_file_path: str,
+    timed_captions: list,
+    words: list,
+    background_video_data: list,
+    profiles: list,
+    prenormalize: bool = False
+) -> list:
+    """
+    Gera um vídeo por perfil (ex. 1920x1080 e 1080x1920) num único passe:
+    os fundos são decodificados e compostos uma vez na resolução do maior
+    perfil (master_profile), qualquer que seja a ordem; cada perfil recorta o seu quadro, recebe suas próprias legendas e
+    alimenta o seu encoder. O áudio é codificado uma vez e copiado em todos.
+    Retorna a lista de arquivos na ordem de profiles.
+    """
+    master = master_profile(profiles)
+    fps = master["fps"]
+    if any(profile["fps"] != fps for profile in profiles):
+        raise ValueError("Todos os perfis de um mesmo passe precisam ter o mesmo fps")
+    master_size = (master["width"], master["height"])
+
+    pool = ReaderPool()
+    store = FrameStore(pool)
+    if prenormalize:
+        from utility.render.background_normalizer import normalize_backgrounds
+        normalized = normalize_backgrounds(
+            background_video_data, width=master["width"], height=master["height"], fps=fps
+        )
+        background_clips = build_normalized_background_clips(normalized, profile=master, pool=pool)
+    else:
+        background_clips = build_background_clips(
+            background_video_data, profile=master, pool=pool, store=store
+        )
+
+    narration = load_narration(audio_file_path)
+    duration = narration.duration
+    shared = SharedFrame(
+        IndexedCompositeVideoClip(background_clips, size=master_size).set_duration(duration)
+    )
+    finals = [
+        IndexedCompositeVideoClip(
+            [profile_view(shared, master_size, profile)]
+            + create_karaoke_clips(timed_captions, words, profile=profile),
+            size=(profile["width"], profile["height"])
+        ).set_duration(duration)
+        for profile in profiles
+    ]
+    outputs = [output_name("rendered_video_karaoke.mp4", profile) for profile in profiles]
+
+    writers = []
+    try:
+        # AAC codificado uma vez a partir do buffer e copiado para cada saída
+        audio_path = narration.aac()
+        writers = [
+            FFMPEG_VideoWriter(
+                output, (profile["width"], profile["height"]), fps,
+                codec="libx264", preset=profile["preset"], audiofile=audio_path
+            )
+            for output, profile in zip(outputs, profiles)
+        ]
+
+        print(f"Renderizando {len(profiles)} perfis num único passe: {', '.join(outputs)}")
+        times = np.arange(0, duration, 1.0 / fps)
+        step = max(len(times) // 10, 1)
+        for i, t in enumerate(times):
+            for clip, writer in zip(finals, writers):
+                writer.write_frame(clip.get_frame(t).astype("uint8", copy=False))
+            if i % step == 0:
+                print(f" {100 * i // len(times)}%")
+    finally:
+        for writer in writers:
+            writer.close()
+        pool.close_all()
+        store.close()
+
+    print(f"Recursos: {format_resource_report(pool.report())}")
+    print(f"Frames reaproveitados: {format_store_report(store.report())}")
+    return outputs
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+import os
+import math
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from utility.audio.narration import load_narration
+from utility.render.ffmpeg_utils import run_ffmpeg
+from utility.render.profiles import FINAL_PROFILE, output_name
+from utility.video.media_cache import fetch_all, format_cache_report
+
+# Processos de render (um trecho da linha do tempo por processo)
+RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', '0')) or os.cpu_count() or 1
+fps = FINAL_PROFILE["fps"]
+
+
+def _frame_round(t: float, fps: int = fps) -> float:
+    """
+    Arredonda para a grade de frames, para que os trechos emendem sem sobra.
+    Meio frame sobe (round() arredondaria para o par: 14.98 s a 25 fps viraria 14.96 s).
+    """
+    return math.floor(float(t) * fps + 0.5) / fps
+
+
+def _frame_ceil(t: float, fps: int = fps) -> float:
+    """Sobe para o próximo frame: o fim do vídeo nunca corta o último frame da narração."""
+    # a tolerância evita que 15.0 * 25 = 375.00000000000006 ganhe um frame a mais
+    return math.ceil(float(t) * fps - 1e-6) / fps
+
+
+def plan_chunks(
+    background_video_data: list,
+    total_duration: float,
+    chunk_length: float = None,
+    fps: int = fps
+) -> list:
+    """
+    Divide a linha do tempo em janelas [(w0, w1), ...].
+    Sem chunk_length, corta nas fronteiras de background_video_data;
+    caso contrário, em janelas de tamanho fixo.
+    """
+    total_duration = _frame_ceil(total_duration, fps)
+    if chunk_length:
+        cuts = [i * chunk_length for i in range(1, int(total_duration // chunk_length) + 1)]
+    else:
+        cuts = [float(t1) for (t1, _), _ in background_video_data]
+    cuts = sorted({_frame_round(c, fps) for c in cuts if 0 < _frame_round(c, fps) < total_duration})
+    edges = [0.0] + cuts + [total_duration]
+    return list(zip(edges, edges[1:]))
+
+
+def resolve_fallbacks(background_video_data: list, available: set = None) -> list:
+    """
+    Segmentos sem URL herdam o último vídeo, como o fallback do render.
+    available: URLs que baixaram; as demais não viram fonte de fallback
+    (como o last_entry de build_background_clips).
+    """
+    resolved = []
+    last_url = None
+    for (t1, t2), video_url in background_video_data:
+        if video_url and (available is None or video_url in available):
+            last_url = video_url
+        resolved.append([[float(t1), float(t2)], video_url or last_url])
+    return resolved
+
+
+def render_chunk(job: dict) -> str:
+    """
+    Renderiza uma janela da linha do tempo (fundos + legendas, sem áudio)
+    num processo separado. Tempos são deslocados para começar em zero.
+    job['profile'] (opcional) define resolução, fps e preset.
+    """
+    # import tardio: cada processo carrega o moviepy por conta própria
+    from moviepy.editor import ColorClip
+    from utility.render.compositor import IndexedCompositeVideoClip
+    from utility.render.reader_pool import ReaderPool, format_resource_report
+    from utility.render.frame_store import FrameStore
+    from utility.render.render_karaoke import (
+        build_background_clips,
+        build_normalized_background_clips,
+        create_karaoke_clips
+    )
+
+    profile = job.get("profile", FINAL_PROFILE)
+    size, fps = (profile["width"], profile["height"]), profile["fps"]
+    w0, w1 = job["window"]
+    backgrounds = [
+        [[t1 - w0, t2 - w0], src]
+        for (t1, t2), src in job["background_video_data"]
+        if t1 < w1 and t2 > w0
+    ]
+    captions = [
+        ((t1 - w0, t2 - w0), txt)
+        for (t1, t2), txt in job["timed_captions"]
+        if t1 < w1 and t2 > w0
+    ]
+    words = [dict(w, start=w["start"] - w0, end=w["end"] - w0) for w in job["words"]]
+
+    # fundo preto garante a duração do trecho mesmo sem vídeo na janela
+    pool = ReaderPool()
+    store = FrameStore(pool)
+    visual_clips = [ColorClip(size, color=(0, 0, 0), duration=w1 - w0)]
+    if job["prenormalized"]:
+        visual_clips.extend(build_normalized_background_clips(backgrounds, profile=profile, pool=pool))
+    else:
+        visual_clips.extend(build_background_clips(backgrounds, profile=profile, pool=pool, store=store))
+    visual_clips.extend(create_karaoke_clips(captions, words, profile=profile))
+
+    # (n - 0.5) frames: iter_frames usa arange(0, duração) e gera exatamente n frames
+    n_frames = int(round((w1 - w0) * fps))
+    final = IndexedCompositeVideoClip(visual_clips, size=size)
+    final = final.set_duration((n_frames - 0.5) / fps)
+    try:
+        final.write_videofile(
+            job["output"],
+            codec='libx264',
+            audio=False,
+            fps=fps,
+            preset=profile["preset"],
+            logger=None
+        )
+    finally:
+        pool.close_all()
+        store.close()
+    print(f"Trecho {w0:.2f}-{w1:.2f}s: {format_resource_report(pool.report())}")
+    return job["output"]
+
+
+def concat_chunks(chunk_files: list, audio_file_path: str, output: str, total_duration: float, work_dir: str) -> str:
+    """Une os trechos com o concat demuxer e copia o AAC da narração (nada é recodificado)."""
+    list_path = os.path.join(work_dir, "chunks.txt")
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in chunk_files:
+            f.write(f"file '{path}'\n")
+
+    run_ffmpeg([
+        "-f", "concat", "-safe", "0", "-i", list_path,
+        "-i", load_narration(audio_file_path).aac(),
+        "-map", "0:v", "-map", "1:a",
+        "-c:v", "copy",
+        "-c:a", "copy",
+        "-t", f"{total_duration:.3f}",
+        output
+    ])
+    return output
+
+
+def get_output_media(
+    audio_file_path: str,
+    timed_captions: list,
+    words: list,
+    background_video_data: list,
+    video_server: str,
+    chunk_length: float = None,
+    max_workers: int = RENDER_WORKERS,
+    prenormalize: bool = False,
+    output: str = None,
+    profile: dict = FINAL_PROFILE
+) -> str:
+    """
+    Render em paralelo por trechos: cada janela (fronteiras dos fundos ou
+    chunk_length segundos) é renderizada num processo; os trechos são unidos
+    com o concat demuxer do ffmpeg sem re-encode e o áudio é mixado uma vez.
+    """
+    output = output or output_name("rendered_video_parallel.mp4", profile)
+    total_duration = load_narration(audio_file_path).duration
+    if prenormalize:
+        # o normalizador resolve os fallbacks pelo que de fato normalizou
+        from utility.render.background_normalizer import normalize_backgrounds
+        background_video_data = normalize_backgrounds(
+            background_video_data, width=profile["width"], height=profile["height"], fps=profile["fps"]
+        )
+    else:
+        # baixa uma vez aqui (os trechos leem do cache) e sabe quais URLs falharam
+        entries, report = fetch_all([video_url for _, video_url in background_video_data])
+        print(f"Fundos: {format_cache_report(report)}")
+        available = {video_url for video_url, entry in entries.items() if entry}
+        background_video_data = resolve_fallbacks(background_video_data, available)
+
+    work_dir = tempfile.mkdtemp(prefix="render_parallel_")
+    try:
+        jobs = [
+            {
+                "window": window,
+                "background_video_data": background_video_data,
+                "timed_captions": timed_captions,
+                "words": words,
+                "prenormalized": prenormalize,
+                "profile": profile,
+                "output": os.path.join(work_dir, f"chunk_{i:04d}.mp4"),
+            }
+            for i, window in enumerate(
+                plan_chunks(background_video_data, total_duration, chunk_length, fps=profile["fps"])
+            )
+        ]
+        print(f"Renderizando {len(jobs)} trechos em até {max_workers} processos...")
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            chunk_files = list(pool.map(render_chunk, jobs))
+
+        concat_chunks(chunk_files, audio_file_path, output, total_duration, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return output
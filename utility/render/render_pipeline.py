@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+import os
+import time
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from utility.render.background_normalizer import NORMALIZE_WORKERS, normalize_segment
+from utility.audio.narration import load_narration
+from utility.render.profiles import FINAL_PROFILE, output_name
+from utility.render.render_parallel import (
+    RENDER_WORKERS,
+    concat_chunks,
+    plan_chunks,
+    render_chunk
+)
+from utility.video.media_cache import fetch
+from utility.video.media_downloader import DOWNLOAD_CONCURRENCY
+
+# Itens aguardando entre uma etapa e a seguinte (limita memória e disco em uso)
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '4'))
+_DONE = object()
+
+
+class StageTimer:
+    """Acumula, com segurança entre threads, o tempo ocupado por etapa."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.busy = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.busy[stage] = self.busy.get(stage, 0.0) + seconds
+
+    def wrap(self, stage: str, fn):
+        def timed(*args):
+            started = time.monotonic()
+            try:
+                return fn(*args)
+            finally:
+                self.add(stage, time.monotonic() - started)
+        return timed
+
+
+def _fetch_or_none(link: str):
+    try:
+        return fetch(link)
+    except Exception as e:
+        print(f"⚠️ Falha ao obter '{link}': {e}")
+        return None
+
+
+def timed_render_chunk(job: dict) -> tuple:
+    """render_chunk medido dentro do processo: retorna (caminho, segundos)."""
+    started = time.monotonic()
+    path = render_chunk(job)
+    return path, time.monotonic() - started
+
+
+def run_pipeline(
+    audio_file_path: str,
+    timed_captions: list,
+    words: list,
+    background_video_data: list,
+    output: str,
+    profile: dict = FINAL_PROFILE,
+    max_downloads: int = DOWNLOAD_CONCURRENCY,
+    max_prepare: int = NORMALIZE_WORKERS,
+    max_renders: int = RENDER_WORKERS,
+    queue_size: int = PIPELINE_QUEUE_SIZE
+) -> tuple:
+    """
+    Download -> normalização -> composição em etapas concorrentes ligadas por
+    filas limitadas: cada trecho começa a ser renderizado assim que seus fundos
+    ficam prontos, enquanto os próximos ainda estão sendo baixados.
+    Retorna (output, relatório de tempo por etapa).
+    """
+    started = time.monotonic()
+    width, height, fps = profile["width"], profile["height"], profile["fps"]
+    timer = StageTimer()
+    total_duration = load_narration(audio_file_path).duration
+    # fallbacks (segmentos sem URL) são resolvidos na preparação, pelo que deu certo
+    segments = [[[float(t1), float(t2)], url] for (t1, t2), url in background_video_data]
+    windows = plan_chunks(segments, total_duration, fps=fps)
+    # segmentos que cada janela precisa antes de ser composta
+    needs = [
+        {i for i, ((t1, t2), _) in enumerate(segments) if t1 < w1 and t2 > w0}
+        for w0, w1 in windows
+    ]
+
+    downloaded = queue.Queue(maxsize=queue_size)
+    prepared = queue.Queue(maxsize=queue_size)
+    download_pool = ThreadPoolExecutor(max_workers=max(max_downloads, 1))
+    prepare_pool = ThreadPoolExecutor(max_workers=max(max_prepare, 1))
+    fetch_timed = timer.wrap("download", _fetch_or_none)
+    normalize_timed = timer.wrap("normalização", normalize_segment)
+
+    def normalize_fallback(sources, duration):
+        # último fundo anterior que baixou e normalizou, como o last_entry do render;
+        # as fontes foram submetidas antes no mesmo pool, então a espera termina
+        for url, source in reversed(sources):
+            if source.result():
+                return normalize_timed((url, duration, width, height, fps))
+        return None
+
+    def produce_downloads():
+        for idx, ((t1, t2), url) in enumerate(segments):
+            downloaded.put((idx, download_pool.submit(fetch_timed, url) if url else None))
+        downloaded.put(_DONE)
+
+    def produce_prepared():
+        sources = []  # (url, normalização) dos segmentos com URL que baixaram
+        while True:
+            item = downloaded.get()
+            if item is _DONE:
+                break
+            idx, future = item
+            (t1, t2), url = segments[idx]
+            if not url:
+                prepared.put((idx, prepare_pool.submit(normalize_fallback, list(sources), t2 - t1)))
+                continue
+            entry = future.result() if future else None
+            normalizing = None
+            if entry:
+                normalizing = prepare_pool.submit(normalize_timed, (url, t2 - t1, width, height, fps))
+                sources.append((url, normalizing))
+            prepared.put((idx, normalizing))
+        prepared.put(_DONE)
+
+    threads = [
+        threading.Thread(target=produce_downloads, daemon=True),
+        threading.Thread(target=produce_prepared, daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    work_dir = tempfile.mkdtemp(prefix="render_pipeline_")
+    normalized = [[list(interval), None] for interval, _ in segments]
+    ready = set()
+    submitted = {}
+    try:
+        with ProcessPoolExecutor(max_workers=max(max_renders, 1)) as render_pool:
+            def submit_ready_windows():
+                for w, (window, need) in enumerate(zip(windows, needs)):
+                    if w not in submitted and need <= ready:
+                        submitted[w] = render_pool.submit(timed_render_chunk, {
+                            "window": window,
+                            "background_video_data": normalized,
+                            "timed_captions": timed_captions,
+                            "words": words,
+                            "prenormalized": True,
+                            "profile": profile,
+                            "output": os.path.join(work_dir, f"chunk_{w:04d}.mp4"),
+                        })
+
+            while True:
+                item = prepared.get()
+                if item is _DONE:
+                    break
+                idx, future = item
+                normalized[idx][1] = future.result() if future else None
+                ready.add(idx)
+                submit_ready_windows()
+            submit_ready_windows()
+
+            chunk_files = []
+            for w in range(len(windows)):
+                path, seconds = submitted[w].result()
+                timer.add("composição", seconds)
+                chunk_files.append(path)
+
+        concat_started = time.monotonic()
+        concat_chunks(chunk_files, audio_file_path, output, total_duration, work_dir)
+        timer.add("concat", time.monotonic() - concat_started)
+    finally:
+        for thread in threads:
+            thread.join(timeout=1)
+        download_pool.shutdown(wait=False)
+        prepare_pool.shutdown(wait=False)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = dict(timer.busy, total=time.monotonic() - started)
+    return output, report
+
+
+def get_output_media(
+    audio_file_path: str,
+    timed_captions: list,
+    words: list,
+    background_video_data: list,
+    video_server: str,
+    output: str = None,
+    profile: dict = FINAL_PROFILE
+) -> str:
+    """
+    Mesma saída do render_karaoke, com download, normalização e composição
+    sobrepostos. Imprime o tempo ocupado em cada etapa.
+    """
+    output = output or output_name("rendered_video_pipeline.mp4", profile)
+    output, report = run_pipeline(
+        audio_file_path, timed_captions, words, background_video_data, output, profile=profile
+    )
+    print("Tempo por etapa: " + ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in report.items()))
+    return output
@@ -37,45 +37,78 @@ def search_videos(query_string: str, orientation_landscape: bool = True) -> dict
     return data
 
 
-def get_best_video(query_string: str, orientation_landscape: bool = True, used_vids: list = None) -> str:
+def pick_rendition(video_files: list, width: int, height: int, exact: bool = False) -> dict:
+    """
+    Escolhe, entre os arquivos de um vídeo, o de width x height exato ou,
+    na falta dele (e sem exact), o menor que ainda cubra essa resolução sem
+    passar de 1920x1080 (1080x1920 em retrato): nada de baixar 1440p/4K.
+    None se nenhum serve.
+    """
+    max_w, max_h = (1920, 1080) if width >= height else (1080, 1920)
+    candidates = [
+        vf for vf in video_files
+        if vf.get('width') and vf.get('height')
+        and width <= vf['width'] <= max_w and height <= vf['height'] <= max_h
+    ]
+    if exact:
+        candidates = [vf for vf in candidates if (vf['width'], vf['height']) == (width, height)]
+    if not candidates:
+        return None
+    return min(
+        candidates,
+        key=lambda vf: ((vf['width'], vf['height']) != (width, height), vf['width'] * vf['height'])
+    )
+
+
+def get_best_video(
+    query_string: str,
+    orientation_landscape: bool = True,
+    used_vids: list = None,
+    target_size: tuple = None
+) -> str:
     """
     Retorna o link do primeiro vídeo não utilizado que atenda à resolução 16:9.
+    target_size: (w, h) desejado; padrão 1920x1080 (ou 1080x1920 em retrato).
+    Em resoluções menores (preview) baixa a versão menor do mesmo vídeo; no
+    tamanho final só serve o arquivo exato, como sempre.
     """
     used_vids = used_vids or []
+    final_size = (1920, 1080) if orientation_landscape else (1080, 1920)
+    if target_size is None:
+        target_size = final_size
+    target_w, target_h = target_size
+    exact = tuple(target_size) == final_size
     data = search_videos(query_string, orientation_landscape)
     videos = data.get('videos', [])
 
     # Filtra vídeos com resolução mínima e proporção 16:9
     if orientation_landscape:
         filtered = [v for v in videos
-                    if v['width'] >= 1920 and v['height'] >= 1080
+                    if v['width'] >= target_w and v['height'] >= target_h
                     and abs((v['width'] / v['height']) - (16/9)) < 0.01]
     else:
         filtered = [v for v in videos
-                    if v['width'] >= 1080 and v['height'] >= 1920
+                    if v['width'] >= target_w and v['height'] >= target_h
                     and abs((v['height'] / v['width']) - (16/9)) < 0.01]
 
     # Ordena por duração próxima a 15s
     filtered.sort(key=lambda v: abs(v.get('duration', 0) - 15))
 
     for video in filtered:
-        for vf in video.get('video_files', []):
-            w, h, link = vf['width'], vf['height'], vf['link']
-            key = link.split('.hd')[0]
-            if orientation_landscape and w == 1920 and h == 1080:
-                if key not in used_vids:
-                    return link
-            if not orientation_landscape and w == 1080 and h == 1920:
-                if key not in used_vids:
-                    return link
+        vf = pick_rendition(video.get('video_files', []), target_w, target_h, exact=exact)
+        if vf is None:
+            continue
+        link = vf['link']
+        if link.split('.hd')[0] not in used_vids:
+            return link
     # se não encontrou
     return None
 
 
-def generate_video_url(timed_searches: list, video_server: str) -> list:
+def generate_video_url(timed_searches: list, video_server: str, target_size: tuple = None) -> list:
     """
     Para cada segmento ([t1, t2], [kw1, kw2,...]), busca um vídeo correspondente.
-    Suporta apenas 'pexels'.
+    Suporta apenas 'pexels'. target_size: ver get_best_video.
     Retorna lista de [[t1, t2], url] (url pode ser None).
     """
     results = []
@@ -84,7 +117,7 @@ def generate_video_url(timed_searches: list, video_server: str) -> list:
         for (t1, t2), queries in timed_searches:
             url = None
             for q in queries:
-                link = get_best_video(q, True, used)
+                link = get_best_video(q, True, used, target_size=target_size)
                 if link:
                     used.append(link.split('.hd')[0])
                     url = link
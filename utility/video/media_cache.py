@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import hashlib
+import threading
+
+from filelock import FileLock, Timeout
+
+from utility.render.ffmpeg_utils import probe_media
+from utility.video.media_downloader import DOWNLOAD_CONCURRENCY, download_all, download_file, format_report
+
+# Cache persistente de vídeos de fundo (compartilhado entre execuções e jobs)
+MEDIA_CACHE_DIR = os.getenv('MEDIA_CACHE_DIR', '.cache/media')
+# Orçamento de disco do cache; entradas menos usadas saem primeiro
+MEDIA_CACHE_MAX_BYTES = int(os.getenv('MEDIA_CACHE_MAX_BYTES', str(5 * 1024 ** 3)))
+# Tempo máximo esperando outro job terminar o mesmo download (s)
+LOCK_TIMEOUT = 600
+
+
+def cache_key(link: str) -> str:
+    """
+    Chave pela URL completa: cada rendição do Pexels (ex. 640x360 do preview e
+    1920x1080 do render final) tem o próprio link e, portanto, a própria
+    entrada. A chave link.split('.hd')[0] de background_video_generator serve
+    para não repetir o vídeo, não para identificar o arquivo.
+    """
+    return hashlib.sha1(link.encode('utf-8')).hexdigest()
+
+
+def _entry_paths(key: str) -> tuple:
+    base = os.path.join(MEDIA_CACHE_DIR, key)
+    return base + ".mp4", base + ".json", base + ".lock"
+
+
+def _lease(media_path: str) -> None:
+    """
+    Marca a entrada como em uso por este processo: evict não a remove enquanto
+    o processo viver (o render abre o arquivo bem depois do fetch).
+    """
+    with open(f"{os.path.splitext(media_path)[0]}.{os.getpid()}.lease", 'a'):
+        pass
+
+
+def _leased(key: str) -> bool:
+    """True se algum processo vivo segura a entrada; leases de processos mortos são apagados."""
+    prefix = key + "."
+    leased = False
+    for name in os.listdir(MEDIA_CACHE_DIR):
+        if not (name.startswith(prefix) and name.endswith(".lease")):
+            continue
+        pid = int(name[len(prefix):-len(".lease")])
+        try:
+            os.kill(pid, 0)
+            leased = True
+        except ProcessLookupError:
+            try:
+                os.remove(os.path.join(MEDIA_CACHE_DIR, name))
+            except OSError:
+                pass
+        except PermissionError:
+            leased = True
+    return leased
+
+
+def _read_entry(media_path: str, meta_path: str) -> dict:
+    """Entrada {'path', 'meta'} se estiver completa no disco, senão None (chamar com o lock da entrada)."""
+    if not (os.path.exists(media_path) and os.path.exists(meta_path)):
+        return None
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        # o mtime do .json marca o último uso (LRU)
+        os.utime(meta_path)
+    except (OSError, ValueError):
+        return None
+    _lease(media_path)
+    return {"path": media_path, "meta": meta}
+
+
+def lookup(link: str) -> dict:
+    """
+    Retorna {'path', 'meta'} se o vídeo já estiver no cache, senão None.
+    meta traz duration, size e fps (do ffprobe), dispensando novo probe.
+    A entrada devolvida fica com lease deste processo (ver evict).
+    """
+    media_path, meta_path, lock_path = _entry_paths(cache_key(link))
+    if not os.path.exists(meta_path):
+        return None
+    # o lock da entrada separa a checagem + lease da remoção feita por evict
+    with FileLock(lock_path, timeout=LOCK_TIMEOUT):
+        return _read_entry(media_path, meta_path)
+
+
+def _download_entry(link: str, media_path: str, session=None) -> dict:
+    """
+    Função de download para download_all (mesma assinatura de download_file):
+    baixa o link para media_path dentro do cache, sob o lock da entrada, e
+    devolve o relatório de download_file com a entrada em 'entry'.
+    Um lock por entrada evita que dois jobs baixem o mesmo arquivo ao mesmo tempo.
+    """
+    base = os.path.splitext(media_path)[0]
+    meta_path, lock_path = base + ".json", base + ".lock"
+    os.makedirs(os.path.dirname(media_path) or ".", exist_ok=True)
+    with FileLock(lock_path, timeout=LOCK_TIMEOUT):
+        entry = _read_entry(media_path, meta_path)
+        if entry:
+            # outro job baixou enquanto esperávamos o lock
+            return {"url": link, "bytes": 0, "seconds": 0.0, "resumes": 0, "entry": dict(entry, hit=True)}
+
+        suffix = f".{os.getpid()}.{threading.get_ident()}"
+        tmp_media = media_path + suffix + ".download.mp4"
+        tmp_meta = meta_path + suffix
+        try:
+            report = download_file(link, tmp_media, session=session)
+            meta = probe_media(tmp_media)
+            meta.update(url=link, bytes=os.path.getsize(tmp_media), cached_at=time.time())
+            os.replace(tmp_media, media_path)
+            with open(tmp_meta, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(tmp_meta, meta_path)
+            _lease(media_path)
+        finally:
+            for leftover in (tmp_media, tmp_media + ".part", tmp_meta):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+    return dict(report, entry={"path": media_path, "meta": meta, "hit": False})
+
+
+def fetch(link: str, session=None) -> dict:
+    """
+    Garante o vídeo no cache e retorna {'path', 'meta', 'hit'}.
+    O cache é podado depois do download, sem tocar nesta entrada.
+    """
+    entry = lookup(link)
+    if entry:
+        return dict(entry, hit=True)
+    key = cache_key(link)
+    entry = _download_entry(link, _entry_paths(key)[0], session=session)["entry"]
+    if not entry["hit"]:
+        evict(keep={key})
+    return entry
+
+
+def evict(max_bytes: int = None, keep: set = ()) -> int:
+    """
+    Remove as entradas usadas há mais tempo até o cache caber em max_bytes
+    (padrão MEDIA_CACHE_MAX_BYTES). Pula as chaves em `keep`, as travadas por
+    outro job (download em curso) e as com lease de um processo vivo (em uso
+    por algum render). Retorna os bytes liberados.
+    """
+    if max_bytes is None:
+        max_bytes = MEDIA_CACHE_MAX_BYTES
+    if not os.path.isdir(MEDIA_CACHE_DIR):
+        return 0
+    with FileLock(os.path.join(MEDIA_CACHE_DIR, ".evict.lock"), timeout=LOCK_TIMEOUT):
+        entries = []
+        for name in os.listdir(MEDIA_CACHE_DIR):
+            if not name.endswith(".json") or name[:-5] in keep:
+                continue
+            key = name[:-5]
+            media_path, meta_path, _ = _entry_paths(key)
+            try:
+                size = os.path.getsize(media_path)
+                last_used = os.path.getmtime(meta_path)
+            except OSError:
+                continue
+            entries.append((last_used, size, key))
+
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for _, size, key in sorted(entries):
+            if total <= max_bytes:
+                break
+            media_path, meta_path, lock_path = _entry_paths(key)
+            lock = FileLock(lock_path, timeout=0)
+            try:
+                lock.acquire()
+            except Timeout:
+                continue
+            try:
+                if _leased(key):
+                    continue
+                # o .lock sai junto: sem a entrada, ele só sobraria no diretório
+                for path in (meta_path, media_path, lock_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+            finally:
+                lock.release()
+            total -= size
+            freed += size
+    return freed
+
+
+def fetch_all(links: list, max_workers: int = DOWNLOAD_CONCURRENCY):
+    """
+    Resolve vários links pelo cache; os ausentes são baixados em paralelo
+    por download_all e o cache é podado uma vez no fim, sem tocar nas
+    entradas deste lote. Retorna ({link: entrada ou None se falhou}, relatório).
+    """
+    started = time.monotonic()
+    unique = list(dict.fromkeys(link for link in links if link))
+
+    entries = {}
+    for link in unique:
+        entry = lookup(link)
+        entries[link] = dict(entry, hit=True) if entry else None
+    missing = [link for link in unique if entries[link] is None]
+    downloads = download_all(
+        [(link, _entry_paths(cache_key(link))[0]) for link in missing],
+        max_workers=max_workers,
+        download=_download_entry
+    )
+    for link, result in zip(missing, downloads["files"]):
+        entries[link] = result.get("entry")
+    if missing:
+        evict(keep={cache_key(link) for link in unique})
+
+    resolved = [e for e in entries.values() if e]
+    report = {
+        "hits": sum(1 for e in resolved if e["hit"]),
+        "misses": sum(1 for e in resolved if not e["hit"]),
+        "failed": len(unique) - len(resolved),
+        "bytes_downloaded": downloads["bytes"],
+        "seconds": time.monotonic() - started,
+        "downloads": downloads,
+    }
+    return entries, report
+
+
+def format_cache_report(report: dict) -> str:
+    """Resumo legível de fetch_all (com o de download_all, se houve downloads)."""
+    summary = f"{report['hits']} do cache, {report['misses']} baixados, {report['failed']} falhas"
+    if report["downloads"]["files"]:
+        summary += f"; downloads: {format_report(report['downloads'])}"
+    return f"{summary}; {report['seconds']:.1f}s"
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Downloads simultâneos (configurável por ENV)
+DOWNLOAD_CONCURRENCY = int(os.getenv('DOWNLOAD_CONCURRENCY', '4'))
+# Tamanho dos blocos gravados em disco
+CHUNK_SIZE = 1 << 20
+# Tentativas seguidas sem progresso por arquivo (retomando de onde parou)
+MAX_RETRIES = 3
+# Espera base entre tentativas (s), dobrada a cada falha
+RETRY_BACKOFF = 1.0
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size: int = DOWNLOAD_CONCURRENCY) -> requests.Session:
+    """Sessão HTTP compartilhada (uma por processo), com pool de conexões reaproveitadas."""
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"User-Agent": "Mozilla/5.0"})
+            _session = session
+            _session_pid = os.getpid()
+        return _session
+
+
+def download_file(
+    url: str,
+    filename: str,
+    session: requests.Session = None,
+    chunk_size: int = CHUNK_SIZE,
+    retries: int = MAX_RETRIES,
+    timeout: float = 30
+) -> dict:
+    """
+    Baixa a URL em blocos direto para o disco (sem carregar tudo em memória).
+    Transferências interrompidas são retomadas com Range a partir do .part;
+    `retries` conta só as tentativas seguidas que não trouxeram bytes novos.
+    Retorna {'url', 'bytes', 'seconds', 'resumes'}.
+    """
+    session = session or get_session()
+    part = filename + ".part"
+    started = time.monotonic()
+    resumes = 0
+    attempt = 0
+    progress = 0
+    while True:
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as resp:
+                if offset and resp.status_code == 416:
+                    # o .part já está completo
+                    break
+                resp.raise_for_status()
+                if offset and resp.status_code != 206:
+                    # servidor ignorou o Range: recomeça do zero
+                    offset = 0
+                with open(part, "ab" if offset else "wb") as f:
+                    for chunk in resp.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                expected = resp.headers.get("Content-Length")
+                if expected is not None and os.path.getsize(part) < offset + int(expected):
+                    raise requests.exceptions.ChunkedEncodingError("transferência incompleta")
+            break
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.Timeout) as e:
+            received = os.path.getsize(part) if os.path.exists(part) else 0
+            # conexão instável que segue entregando bytes não esgota as tentativas
+            attempt = 1 if received > progress else attempt + 1
+            progress = max(progress, received)
+            if attempt > retries:
+                raise
+            resumes += 1
+            print(f"⚠️ Download interrompido ({e}); retomando '{url}' ({attempt}/{retries})")
+            time.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+
+    os.replace(part, filename)
+    return {
+        "url": url,
+        "bytes": os.path.getsize(filename),
+        "seconds": time.monotonic() - started,
+        "resumes": resumes,
+    }
+
+
+def download_all(
+    jobs: list,
+    max_workers: int = DOWNLOAD_CONCURRENCY,
+    session: requests.Session = None,
+    download=download_file
+) -> dict:
+    """
+    Baixa vários arquivos em paralelo. jobs: [(url, filename), ...].
+    download: função com a assinatura de download_file (o cache de mídia
+    passa a sua, que trava e registra a entrada).
+    Falhas não interrompem os demais; ficam em 'error' no item correspondente.
+    Retorna {'files': [...], 'bytes', 'seconds', 'throughput'} (throughput em bytes/s).
+    """
+    session = session or get_session(max(max_workers, 1))
+    started = time.monotonic()
+
+    def fetch(job):
+        url, filename = job
+        try:
+            return download(url, filename, session=session)
+        except Exception as e:
+            print(f"⚠️ Falha ao baixar '{url}': {e}")
+            return {"url": url, "bytes": 0, "seconds": 0.0, "resumes": 0, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as pool:
+        files = list(pool.map(fetch, jobs))
+
+    elapsed = time.monotonic() - started
+    total = sum(f["bytes"] for f in files)
+    return {
+        "files": files,
+        "bytes": total,
+        "seconds": elapsed,
+        "throughput": total / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def format_report(report: dict) -> str:
+    """Resumo legível de download_all."""
+    failed = sum(1 for f in report["files"] if "error" in f)
+    return (
+        f"{len(report['files'])} arquivos ({failed} falhas), "
+        f"{report['bytes'] / 1e6:.1f} MB em {report['seconds']:.1f}s "
+        f"({report['throughput'] / 1e6:.2f} MB/s)"
+    )